@@ -0,0 +1,337 @@
+import argparse
+import os
+import numpy as np
+import cv2
+from flower import Flower
+from rng import get_state, set_state
+from writer import to_uint8
+
+# codecs of video files by extension, frames are written as PNG files for other paths
+VIDEO_CODECS = {'.mp4': 'mp4v',
+                '.avi': 'MJPG'}
+
+
+class LevelFlower(Flower):
+    """
+    Flower, which keeps state of random generator before every drawn level,
+    so a level can be drawn again with the same random choices (petal width, rotation and gradient center),
+    see redraw_level. Flower should be layered
+    """
+    def __init__(self, *args, **kwargs):
+        self.level_states = []
+        super().__init__(*args, **kwargs)
+        self.base = self.canvas.copy()
+
+    def draw_level(self, *args, grad_colors=None, **kwargs):
+        # colors are drawn before the saved state, so level can be drawn again with any colors
+        grad_colors = self.get_colors(grad_colors)
+        self.level_states.append(get_state(self.rng))
+        super().draw_level(*args, grad_colors=grad_colors, **kwargs)
+
+    def get_colors(self, grad_colors):
+        """
+        Gradient colors (from, to and border color) from colormap name, colors or None for random colors
+        """
+        if not grad_colors:
+            return self.colorer.get_random_colors()
+        if isinstance(grad_colors, str):
+            return self.colorer.get_colors(grad_colors)
+        return grad_colors
+
+    def redraw_level(self, level, level_size, scale, scale_x, grad_colors, record=False):
+        """
+        Draws level of drawn flower again alone on the clean canvas
+
+        Parameters
+        ---------
+        level: int, required
+            Level number
+
+        level_size: int, required
+            Level size, see Flower.draw
+
+        scale: int, required
+            Petal scale of level
+
+        scale_x: float, required
+            Petal narrowing of level
+
+        grad_colors: list, required
+            Gradient colors (from, to and border color)
+
+        record: bool
+            Return geometry index of layer to recolor it, default=False
+
+        Returns
+        ----------
+        dict:
+            box (first column, first row, last column + 1, last row + 1) of layer,
+            rgb image and bool alpha in box, geometry 'index' and 'level' if record is True
+        """
+        set_state(self.rng, self.level_states[level])
+        self.canvas[...] = self.base
+        self.layers, self.colors = [], []
+        if record:
+            self.init_geometry()
+        Flower.draw_level(self, level_size, self.petal_cnt[level], self.petal_kinds[level],
+                          center_dist=self.drawn_center_dist[level], grad_colors=grad_colors,
+                          scale=scale, scale_x=scale_x)
+        box = self.layers[0]['box']
+        rgba = self.layers[0]['rgba']
+        layer = {'box': box, 'rgb': rgba[..., :3], 'alpha': rgba[..., 3] > 0}
+        if record:
+            layer['index'] = self.geometry['index'][box[1]:box[3], box[0]:box[2]].copy()
+            layer['level'] = self.geometry['levels'][0]
+        return layer
+
+
+class FlowerAnimation():
+    """
+    Frames of flower animation: levels rotate with their own speeds, petals open and gradients shift.
+    Every level is drawn once on its own layer, layers are rotated with cv2.warpAffine and
+    put on the flower center back to front. Level is drawn again only when its petal scale changes,
+    shifted gradients are put on layer by geometry record, see Flower.recolor
+
+    Parameters
+    ---------
+    frames: int
+        Count of frames, default=60
+
+    seed: int
+        Seed of flower, default=None (random)
+
+    params: dict
+        Flower parameters, 'grad_colors' is passed to Flower.draw, see batch.render_flower, default=None
+
+    rotation: float or list
+        Rotation of every level in degrees per frame, default=0
+
+    opening: float
+        Petal size on the first frame relative to the flower petal size,
+        0.5 - petals grow from half size, default=None (petals don't open)
+
+    opening_scale_x: float or list
+        Petal narrowing of every level on the first frame, see Flower, default=None (the same)
+
+    opening_frames: int
+        Count of frames to open petals, default=None (all frames)
+
+    gradient_to: str or list
+        Colormap name, gradient colors (from, to and border color) or 'random',
+        colors of levels shift to on the last frame, default=None (colors don't shift)
+
+    Attributes
+    ---------
+    flower: LevelFlower
+        Drawn flower, its parameters are parameters of the last frame
+
+    layers: list
+        The last drawn layer of every level, see LevelFlower.redraw_level
+    """
+    def __init__(self, frames=60, seed=None, params=None, rotation=0, opening=None, opening_scale_x=None,
+                 opening_frames=None, gradient_to=None):
+        params = dict(params or {})
+        grad_colors = params.pop('grad_colors', 'hot')
+        params['layered'] = True
+        self.frames = frames
+        self.flower = LevelFlower(rng=seed, **params)
+        self.flower.draw(grad_colors=grad_colors)
+        levels_cnt = self.flower.levels_cnt
+        self.rotation = self.per_level(rotation)
+        self.opening = opening
+        self.opening_frames = opening_frames or frames
+        self.scale = [int(s) for s in self.flower.scale]
+        self.scale_x = [float(s) for s in self.flower.scale_x]
+        self.start_scale_x = self.scale_x if opening_scale_x is None else self.per_level(opening_scale_x)
+        self.colors = [np.array(colors, dtype=np.float64) for colors in self.flower.colors]
+        self.colors_to = None
+        if gradient_to is not None:
+            gradient_to = None if gradient_to == 'random' else gradient_to
+            self.colors_to = [np.array(self.flower.get_colors(gradient_to), dtype=np.float64)
+                              for i in range(levels_cnt)]
+        self.level_sizes = [self.flower.img_size]
+        for shrink in self.flower.drawn_level_shrink[:-1]:
+            self.level_sizes.append(int(np.round(self.level_sizes[-1]*shrink)))
+        self.layers = [None]*levels_cnt
+
+    def __len__(self):
+        return self.frames
+
+    def __iter__(self):
+        for frame in range(self.frames):
+            yield self.render_frame(frame)
+
+    def per_level(self, values):
+        """
+        List of values of every level from one value or list
+        """
+        if np.isscalar(values):
+            return [values]*self.flower.levels_cnt
+        return list(values)
+
+    def progress(self, frame, frames):
+        return min(frame/(frames - 1), 1) if frames > 1 else 1
+
+    def get_level_params(self, level, frame):
+        """
+        Petal scale, petal narrowing, gradient colors and rotation angle of level on frame
+        """
+        scale, scale_x = self.scale[level], self.scale_x[level]
+        opened = self.progress(frame, self.opening_frames)
+        if self.opening is not None:
+            # more scale, less petal
+            scale = int(np.round(scale/(self.opening + (1 - self.opening)*opened)))
+        start_scale_x = self.start_scale_x[level]
+        scale_x = float(start_scale_x + (scale_x - start_scale_x)*opened)
+        colors = self.colors[level]
+        if self.colors_to is not None:
+            colors = colors + (self.colors_to[level] - colors)*self.progress(frame, self.frames)
+        return scale, scale_x, colors, self.rotation[level]*frame
+
+    def get_layer(self, level, scale, scale_x, colors):
+        """
+        Layer of level, it is drawn again only if petal scale is changed, otherwise it is recolored
+        """
+        layer = self.layers[level]
+        record = self.colors_to is not None
+        if layer is None or layer['key'] != (scale, scale_x):
+            layer = self.flower.redraw_level(level, self.level_sizes[level], scale, scale_x,
+                                             colors.tolist(), record)
+            layer['key'] = (scale, scale_x)
+            layer['colors'] = colors
+            self.layers[level] = layer
+        elif record and not np.array_equal(layer['colors'], colors):
+            palette = self.flower.get_palette([colors.tolist()], [layer['level']])
+            layer['rgb'] = np.take(palette, layer['index'], axis=0)
+            layer['colors'] = colors
+        return layer
+
+    def put_layer(self, canvas, layer, angle):
+        """
+        Puts layer on float canvas rotated by angle around flower center
+        """
+        x0, y0, x1, y1 = layer['box']
+        if angle % 360 == 0:
+            alpha = layer['alpha']
+            canvas[y0:y1, x0:x1][alpha] = layer['rgb'][alpha]
+            return
+        size = self.flower.render_size
+        center = int(np.round(size/2))
+        # the same direction as rotation of petals, see Flower.place_points
+        matrix = cv2.getRotationMatrix2D((center, center), -angle, 1.0)
+        corners = np.array([[x0, y0], [x1, y0], [x0, y1], [x1, y1]], dtype=np.float64)
+        corners = corners @ matrix[:, :2].T + matrix[:, 2]
+        start = np.clip(np.floor(corners.min(axis=0)).astype(int), 0, size)
+        end = np.clip(np.ceil(corners.max(axis=0)).astype(int) + 1, 0, size)
+        if np.any(end <= start):
+            return
+        matrix[:, 2] += matrix[:, :2] @ [x0, y0] - start
+        # premultiplied alpha, so colors outside petals don't leak into smoothed borders
+        alpha = layer['alpha'].astype(np.float32)[..., None]
+        rgba = np.dstack([layer['rgb'].astype(np.float32)*alpha, alpha])
+        rgba = cv2.warpAffine(rgba, matrix, tuple(int(s) for s in end - start), flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        region = canvas[start[1]:end[1], start[0]:end[0]]
+        region *= 1 - rgba[..., 3:]
+        region += rgba[..., :3]
+
+    def render_frame(self, frame):
+        """
+        Draws frame
+
+        Parameters
+        ---------
+        frame: int, required
+            Frame number
+
+        Returns
+        ----------
+        numpy.array:
+            image of frame with flower type
+        """
+        canvas = self.flower.base.astype(np.float32)
+        for level in range(self.flower.levels_cnt):
+            scale, scale_x, colors, angle = self.get_level_params(level, frame)
+            self.put_layer(canvas, self.get_layer(level, scale, scale_x, colors), angle)
+        if self.flower.supersample > 1:
+            size = (self.flower.img_size, self.flower.img_size)
+            canvas = cv2.resize(canvas, size, interpolation=cv2.INTER_AREA)
+        dtype = self.flower.dtype
+        if np.issubdtype(dtype, np.integer):
+            max_value = np.iinfo(dtype).max
+            return np.clip(np.round(canvas), 0, max_value).astype(dtype)
+        return canvas.astype(dtype)
+
+    def save(self, path, fps=25):
+        """
+        Writes frames in order to video file (see VIDEO_CODECS) or to directory as PNG files
+
+        Parameters
+        ---------
+        path: str, required
+            Path of video file or directory
+
+        fps: float
+            Frames per second of video, default=25
+
+        Returns
+        ----------
+        int:
+            count of written frames
+        """
+        codec = VIDEO_CODECS.get(os.path.splitext(path)[1].lower())
+        video = None
+        if codec is None:
+            os.makedirs(path, exist_ok=True)
+        count = 0
+        try:
+            for frame, img in enumerate(self):
+                img = cv2.cvtColor(to_uint8(img), cv2.COLOR_RGB2BGR)
+                if codec is None:
+                    cv2.imwrite(os.path.join(path, 'frame_%05d.png' % frame), img)
+                else:
+                    if video is None:
+                        video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, img.shape[1::-1])
+                    video.write(img)
+                count += 1
+        finally:
+            if video is not None:
+                video.release()
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Draw flower animation')
+    parser.add_argument('out', help='video file (.mp4, .avi) or directory of PNG frames')
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--fps', type=float, default=25)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--img-size', type=int, default=300)
+    parser.add_argument('--center-size', type=int, default=40)
+    parser.add_argument('--levels-cnt', type=int, default=2)
+    parser.add_argument('--fill-type', default='center', choices=['top_down', 'diagonal', 'center'])
+    parser.add_argument('--engine', default='points', choices=['points', 'analytic'])
+    parser.add_argument('--grad-colors', default='hot', help="colormap name or 'random'")
+    parser.add_argument('--rotation', type=float, nargs='+', default=[0],
+                        help='degrees per frame of every level')
+    parser.add_argument('--opening', type=float, default=None, help='petal size on the first frame')
+    parser.add_argument('--gradient-to', default=None, help="colormap name or 'random' to shift colors to")
+    parser.add_argument('--supersample', type=int, default=1)
+    args = parser.parse_args()
+
+    rotation = args.rotation[0] if len(args.rotation) == 1 else args.rotation
+    params = {'img_size': args.img_size,
+              'center_size': args.center_size,
+              'levels_cnt': args.levels_cnt,
+              'fill_type': args.fill_type,
+              'engine': args.engine,
+              'dtype': np.uint8,
+              'supersample': args.supersample,
+              'grad_colors': None if args.grad_colors == 'random' else args.grad_colors}
+    animation = FlowerAnimation(args.frames, args.seed, params, rotation, args.opening,
+                                gradient_to=args.gradient_to)
+    print('%d frames are written' % animation.save(args.out, args.fps))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import cv2
+from flower import Flower
+from cache import GeometryCache
+from writer import write_dataset, to_uint8
+from spec import FlowerSpec
+
+# geometry cache of worker process
+worker_cache = None
+
+# count of new seeds for flower, which petals are out of image
+MAX_RETRIES = 10
+
+
+def init_worker(cache_dir=None, max_bytes=256*2**20):
+    """
+    Makes geometry cache of worker process, cache_dir is shared by all workers
+    """
+    global worker_cache
+    worker_cache = GeometryCache(max_bytes, cache_dir)
+
+
+def retry_seed(seed, attempt):
+    """
+    Seed of attempt to draw flower again, the same for the same seed and attempt
+    """
+    if attempt == 0:
+        return seed
+    return int(np.random.SeedSequence([seed, attempt]).generate_state(1)[0])
+
+
+def draw_flower(seed, params=None, cache=None, canvas=None, max_retries=MAX_RETRIES):
+    """
+    Draws flower, flower with petal out of image is drawn again with new seed, see retry_seed
+
+    Parameters
+    ---------
+    seed: int, required
+        Seed of random generator for this flower
+
+    params: dict
+        Flower parameters, 'grad_colors' is passed to Flower.draw, other to Flower, default=None
+
+    cache: GeometryCache
+        Cache of petal geometry, default=None
+
+    canvas: numpy.array
+        Array to draw flower in, see Flower, default=None
+
+    max_retries: int
+        Count of new seeds to try, default=MAX_RETRIES
+
+    Returns
+    ----------
+    tuple:
+        drawn flower and its seed
+
+    Raises
+    ----------
+    IndexError:
+        if petals are out of image with all seeds
+    """
+    params = dict(params or {})
+    grad_colors = params.pop('grad_colors', 'hot')
+    for attempt in range(max_retries + 1):
+        task_seed = retry_seed(seed, attempt)
+        try:
+            flower = Flower(rng=task_seed, cache=cache, canvas=canvas, **params)
+            flower.draw(grad_colors=grad_colors)
+            return flower, task_seed
+        except IndexError:
+            if attempt == max_retries:
+                raise
+
+
+def render_flower(seed, params=None, with_params=False, max_retries=MAX_RETRIES):
+    """
+    Render one flower
+
+    Parameters
+    ---------
+    seed: int, required
+        Seed of random generator for this flower
+
+    params: dict
+        Flower parameters, 'grad_colors' is passed to Flower.draw, other to Flower, default=None
+
+    with_params: bool
+        Return parameters of drawn flower too, default=False
+
+    max_retries: int
+        Count of new seeds for flower, which petals are out of image, see draw_flower, default=MAX_RETRIES
+
+    Returns
+    ----------
+    tuple:
+        seed of drawn flower (it differs from seed if flower is drawn again) and image containing flower,
+        and parameters of flower with seed if with_params is True
+    """
+    if worker_cache is None:
+        init_worker()
+    flower, seed = draw_flower(seed, params, worker_cache, max_retries=max_retries)
+    if with_params:
+        return seed, flower.img, dict(flower.get_params(), seed=seed)
+    return seed, flower.img
+
+
+def generate_batch(n, params=None, workers=None, seed=None, max_pending=None, cache_dir=None,
+                   with_params=False, seeds=None, max_retries=MAX_RETRIES, stats=None):
+    """
+    Render flowers in worker processes, images are returned as soon as they are finished
+
+    Parameters
+    ---------
+    n: int, required
+        Count of flowers
+
+    params: dict or list
+        Flower parameters, the same for all flowers, or list of parameters of every flower
+        (see render_flower and FlowerSpec.to_params), default=None
+
+    workers: int
+        Count of worker processes, default=None (count of processors)
+
+    seed: int
+        Seed to generate seeds of all flowers, default=None (random)
+
+    max_pending: int
+        Max count of rendering flowers, not returned yet, default=None (4 per worker)
+
+    cache_dir: str
+        Directory to share petal geometry cache between workers, default=None (memory only)
+
+    with_params: bool
+        Return parameters of every flower too, see render_flower, default=False
+
+    seeds: list
+        Seeds of flowers, 'seed' column of FlowerSpec.sample for example, default=None (generated from seed)
+
+    max_retries: int
+        Count of new seeds for flower, which petals are out of image, see draw_flower.
+        Flower is skipped, if petals are out of image with all seeds, default=MAX_RETRIES
+
+    stats: dict
+        Dict to count 'retried' (drawn with new seed) and 'skipped' flowers in, default=None
+
+    Yields
+    ----------
+    tuple:
+        seed of drawn flower and image containing flower (and parameters), in order of finishing
+    """
+    if seeds is None:
+        seeds = np.random.SeedSequence(seed).generate_state(n)
+    if stats is None:
+        stats = {}
+    stats.setdefault('retried', 0)
+    stats.setdefault('skipped', 0)
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 4*workers
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(cache_dir,)) as executor:
+        pending = {}
+        for i, task_seed in enumerate(seeds[:n]):
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finished(done, pending, stats)
+            task_params = params[i] if isinstance(params, (list, tuple)) else params
+            future = executor.submit(render_flower, int(task_seed), task_params, with_params, max_retries)
+            pending[future] = int(task_seed)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done, pending, stats)
+
+
+def finished(done, pending, stats):
+    """
+    Yields results of finished flowers and removes them from pending, flowers with petals
+    out of image are counted as skipped
+    """
+    for future in done:
+        task_seed = pending.pop(future)
+        try:
+            result = future.result()
+        except IndexError:
+            stats['skipped'] += 1
+            continue
+        if result[0] != task_seed:
+            stats['retried'] += 1
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render a batch of flower images')
+    parser.add_argument('-n', type=int, default=100, help='count of flowers')
+    parser.add_argument('--out', default='flowers', help='directory to save images')
+    parser.add_argument('--format', default='png', choices=['png', 'tar', 'npy'],
+                        help='png files, tar shards or one npy file with parameters in params.jsonl')
+    parser.add_argument('--image-format', default='png', choices=['png', 'jpg', 'webp'],
+                        help='image encoding in tar shards')
+    parser.add_argument('--shard-size', type=int, default=10000, help='count of images in tar shard')
+    parser.add_argument('--workers', type=int, default=None, help='count of worker processes')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the batch')
+    parser.add_argument('--img-size', type=int, default=300)
+    parser.add_argument('--center-size', type=int, default=40)
+    parser.add_argument('--levels-cnt', type=int, default=2)
+    parser.add_argument('--fill-type', default='center', choices=['top_down', 'diagonal', 'center'])
+    parser.add_argument('--dtype', default='uint8', choices=['uint8', 'float32', 'float64'],
+                        help='type of rendered image')
+    parser.add_argument('--supersample', type=int, default=1, help='draw k times larger and downsample')
+    parser.add_argument('--engine', default='points', choices=['points', 'analytic'],
+                        help='gradient filling engine')
+    parser.add_argument('--grad-colors', default='hot', help='colormap name')
+    parser.add_argument('--cache-dir', default=None, help='directory of petal geometry cache')
+    parser.add_argument('--spec', default=None,
+                        help='JSON or YAML flower spec, flower options above are ignored')
+    parser.add_argument('--start', type=int, default=0, help='first spec row to render')
+    parser.add_argument('--stop', type=int, default=None, help='last spec row to render (exclusive)')
+    parser.add_argument('--log-every', type=int, default=100, help='report speed every N images')
+    args = parser.parse_args()
+
+    params = {'img_size': args.img_size,
+              'center_size': args.center_size,
+              'levels_cnt': args.levels_cnt,
+              'fill_type': args.fill_type,
+              'dtype': args.dtype,
+              'supersample': args.supersample,
+              'engine': args.engine,
+              'grad_colors': args.grad_colors}
+    seeds = None
+    if args.spec:
+        # rows of the whole job are sampled, so shards of job have the same flowers
+        spec = FlowerSpec.load(args.spec)
+        rows = spec.sample(args.n, args.seed)[args.start:args.stop]
+        params, seeds = [spec.to_params(row) for row in rows], rows['seed']
+        args.n = len(rows)
+    stats = {}
+    flowers = generate_batch(args.n, params, args.workers, args.seed,
+                             cache_dir=args.cache_dir, with_params=True, seeds=seeds, stats=stats)
+    start = time.perf_counter()
+
+    def report(flowers):
+        i = 0
+        for i, flower in enumerate(flowers, 1):
+            yield flower
+            if i % args.log_every == 0:
+                elapsed = time.perf_counter() - start
+                print('%d images, %.1f images/s' % (i, i/elapsed))
+        elapsed = time.perf_counter() - start
+        print('%d images, %.1f images/s, %d drawn with new seed (petals out of image), %d skipped'
+              % (i, i/elapsed, stats['retried'], stats['skipped']))
+
+    if args.format == 'png':
+        os.makedirs(args.out, exist_ok=True)
+        for seed, img, _ in report(flowers):
+            img = cv2.cvtColor(to_uint8(img), cv2.COLOR_RGB2BGR)
+            cv2.imwrite(os.path.join(args.out, '%d.png' % seed), img)
+    else:
+        write_dataset(report(flowers), args.out, out_format=args.format, image_format=args.image_format,
+                      shard_size=args.shard_size, count=args.n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import cv2
+from petal import Petal
+from colorer import Colorer
+from flower import Flower
+
+
+def measure(fun, repeat=10, setup=None, warmup=1):
+    """
+    Measures latency and peak memory of function
+
+    Parameters
+    ---------
+    fun: callable, required
+        Function to measure, called with result of setup
+
+    repeat: int
+        Count of measured calls, default=10
+
+    setup: callable
+        Function to prepare arguments of every call, is not measured, default=None
+
+    warmup: int
+        Count of calls before measuring, default=1
+
+    Returns
+    ----------
+    dict:
+        latency percentiles and mean in ms, calls per second, peak memory in MB
+        and count of calls failed with IndexError (petal is out of image),
+        latencies and calls per second are None if all calls failed
+    """
+    def call(i):
+        args = setup(i) if setup else ()
+        start = time.perf_counter()
+        fun(*args)
+        return time.perf_counter() - start
+
+    times, errors = [], 0
+    for i in range(warmup + repeat):
+        try:
+            elapsed = call(i)
+        except IndexError:
+            errors += 1
+            continue
+        if i >= warmup:
+            times.append(elapsed)
+    # memory is measured in separate call, tracemalloc slows down the code
+    tracemalloc.start()
+    try:
+        call(warmup + repeat)
+    except IndexError:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if not times:
+        return {'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'mean_ms': None, 'per_sec': None,
+                'peak_mb': peak/2**20, 'errors': errors}
+    times = np.array(times)*1000
+    return {'p50_ms': float(np.percentile(times, 50)),
+            'p90_ms': float(np.percentile(times, 90)),
+            'p99_ms': float(np.percentile(times, 99)),
+            'mean_ms': float(times.mean()),
+            'per_sec': float(1000/times.mean()),
+            'peak_mb': peak/2**20,
+            'errors': errors}
+
+
+def bench_import(repeat=5, modules=('petal', 'colorer', 'flower')):
+    """
+    Measures import time of modules in new python process,
+    finds heavy modules (scipy, matplotlib), which are imported with them
+    """
+    code = ('import sys, time, json\n'
+            'start = time.perf_counter()\n'
+            'import %s\n'
+            'elapsed = time.perf_counter() - start\n'
+            'heavy = [m for m in ("scipy", "matplotlib") if m in sys.modules]\n'
+            'print(json.dumps([elapsed, heavy]))')
+    results = {}
+    for module in modules:
+        times = []
+        for i in range(repeat):
+            out = subprocess.run([sys.executable, '-c', code % module], capture_output=True, text=True,
+                                 check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            elapsed, heavy = json.loads(out.stdout)
+            times.append(elapsed*1000)
+        results['import/%s' % module] = {'p50_ms': float(np.percentile(times, 50)),
+                                         'p90_ms': float(np.percentile(times, 90)),
+                                         'p99_ms': float(np.percentile(times, 99)),
+                                         'mean_ms': float(np.mean(times)),
+                                         'per_sec': float(1000/np.mean(times)),
+                                         'peak_mb': 0.0,
+                                         'errors': 0,
+                                         'heavy_modules': heavy}
+    return results
+
+
+def bench_petal(repeat=10, img_size=300):
+    """
+    Measures Petal.draw for every petal kind
+    """
+    petal = Petal()
+    results = {}
+    for kind in petal.kinds():
+        results['petal/kind=%d' % kind] = measure(
+            lambda: petal.draw(int(np.round(img_size/3)), kind, True, True, 95, 0.2), repeat)
+    return results
+
+
+def bench_colorer(repeat=10, img_size=300, fill_color=(0.5, 0.5, 0.5)):
+    """
+    Measures get_points and fill of Colorer for every filling type
+    """
+    lvl_size = int(np.round(img_size/3))
+    contour = Petal().draw(lvl_size, 3, True, True, 95, 0.2)
+    img_size_new = int(np.round((lvl_size/95)*120))
+    results = {}
+    for fill_type in ('top_down', 'diagonal', 'center'):
+        colorer = Colorer(fill_type, rng=0)
+        results['colorer/%s/get_points' % fill_type] = measure(
+            lambda: colorer.get_points(contour, img_size_new), repeat)
+        points = colorer.get_points(contour, img_size_new)
+
+        def setup(i):
+            img = np.ones((img_size_new + 2, img_size_new + 2, 3))
+            cv2.fillPoly(img, pts=[contour], color=fill_color)
+            return (img,)
+        results['colorer/%s/fill' % fill_type] = measure(
+            lambda img: colorer.fill(img, contour, points, (1, 0.6, 0), (0.8, 0.4, 0), fill_color),
+            repeat, setup)
+    return results
+
+
+def bench_flower(repeat=10, sizes=(100, 300, 512, 1024), levels=(2, 3), petal_cnts=(4, 7),
+                 fill_types=('top_down', 'diagonal', 'center'), dtype='float64'):
+    """
+    Measures Flower.draw for image sizes, levels counts, petal counts and filling types
+    """
+    results = {}
+    for size in sizes:
+        for levels_cnt in levels:
+            for petal_cnt in petal_cnts:
+                for fill_type in fill_types:
+                    def setup(i):
+                        return (Flower(size, int(np.round(size*0.13)), levels_cnt=levels_cnt, fill_type=fill_type,
+                                       petal_cnt=petal_cnt, dtype=dtype, rng=i),)
+                    name = 'flower/size=%d/levels=%d/petals=%d/%s' % (size, levels_cnt, petal_cnt, fill_type)
+                    results[name] = measure(lambda flower: flower.draw(), repeat, setup)
+    return results
+
+
+def run(repeat=10, sizes=(100, 300, 512, 1024), levels=(2, 3), petal_cnts=(4, 7), dtype='float64'):
+    """
+    Runs all benchmarks
+
+    Returns
+    ----------
+    dict:
+        environment description and results of every benchmark
+    """
+    results = {}
+    results.update(bench_import(repeat))
+    results.update(bench_petal(repeat))
+    results.update(bench_colorer(repeat))
+    results.update(bench_flower(repeat, sizes, levels, petal_cnts, dtype=dtype))
+    return {'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                     'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'opencv': cv2.__version__,
+                     'machine': platform.machine(),
+                     'repeat': repeat,
+                     'dtype': dtype},
+            'results': results}
+
+
+def compare(results, baseline, max_slowdown=1.2):
+    """
+    Finds benchmarks, which are slower than in baseline
+
+    Parameters
+    ---------
+    results: dict, required
+        Results of run
+
+    baseline: dict, required
+        Results of run of previous version
+
+    max_slowdown: float
+        Max allowed ratio of median latency to baseline one, default=1.2
+
+    Returns
+    ----------
+    list:
+        (name, baseline median, median) of slower benchmarks and benchmarks, which calls all failed
+        (median is None), baseline median is None if baseline calls all failed or benchmark is new
+    """
+    slower = []
+    for name, res in results['results'].items():
+        base = baseline['results'].get(name) or {}
+        base_p50 = base.get('p50_ms')
+        if res['p50_ms'] is None:
+            slower.append((name, base_p50, None))
+        elif base_p50 is not None and res['p50_ms'] > base_p50*max_slowdown:
+            slower.append((name, base_p50, res['p50_ms']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark petal drawing, filling and flower drawing')
+    parser.add_argument('--out', default=None, help='path to save results in JSON')
+    parser.add_argument('--repeat', type=int, default=10, help='count of measured calls')
+    parser.add_argument('--sizes', default='100,300,512,1024', help='image sizes, comma separated')
+    parser.add_argument('--levels', default='2,3', help='levels counts, comma separated')
+    parser.add_argument('--petals', default='4,7', help='petal counts, comma separated')
+    parser.add_argument('--dtype', default='float64', choices=['uint8', 'float32', 'float64'])
+    parser.add_argument('--baseline', default=None, help='path to results of previous version')
+    parser.add_argument('--max-slowdown', type=float, default=1.2,
+                        help='fail if median latency is slower than baseline in this ratio')
+    args = parser.parse_args()
+
+    def to_ints(values):
+        return [int(v) for v in values.split(',')]
+
+    results = run(args.repeat, to_ints(args.sizes), to_ints(args.levels), to_ints(args.petals), args.dtype)
+    for name, res in results['results'].items():
+        if res['p50_ms'] is None:
+            print('%-50s all %d calls failed' % (name, res['errors']))
+            continue
+        print('%-50s p50 %9.2f ms  p90 %9.2f ms  %8.1f /s  peak %7.1f MB'
+              % (name, res['p50_ms'], res['p90_ms'], res['per_sec'], res['peak_mb']))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2, allow_nan=False)
+    # the core modules should be imported without plotting and scipy
+    heavy = {name: res['heavy_modules'] for name, res in results['results'].items() if res.get('heavy_modules')}
+    for name, modules in heavy.items():
+        print('heavy imports: %s imports %s' % (name, ', '.join(modules)))
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = compare(results, json.load(f), args.max_slowdown)
+        for name, base, curr in slower:
+            if curr is None:
+                print('failed: %s all calls failed' % name)
+            else:
+                print('slower: %s %.2f ms -> %.2f ms' % (name, base, curr))
+        if slower:
+            sys.exit(1)
+    if heavy:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
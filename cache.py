@@ -0,0 +1,141 @@
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+
+class GeometryCache():
+    """
+    Cache of petal geometry: petal contour and points inside contour in filling order.
+    Keeps the last used values in memory, size of memory is bounded.
+    Values can be stored in directory on disk too, to share them between processes.
+
+    Parameters
+    ---------
+    max_bytes: int
+        Max size of cached arrays in memory, default=256 MB
+
+    cache_dir: str
+        Directory to store values on disk, default=None (no disk store)
+
+    Attributes
+    ---------
+    hits: int
+        Count of values found in memory
+
+    disk_hits: int
+        Count of values found on disk
+
+    misses: int
+        Count of values not found
+
+    nbytes: int
+        Size of cached arrays in memory
+    """
+    def __init__(self, max_bytes=256*2**20, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.values = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, *args):
+        """
+        Makes key from numbers, strings and bools, numpy scalars are converted to python ones
+        """
+        return tuple(a.item() if isinstance(a, np.generic) else a for a in args)
+
+    def get(self, key):
+        """
+        Finds value by key
+
+        Parameters
+        ---------
+        key: tuple, required
+            Key of value, see make_key
+
+        Returns
+        ----------
+        tuple or None:
+            contour and list of points inside contour, None if value is not found
+        """
+        if key in self.values:
+            self.values.move_to_end(key)
+            self.hits += 1
+            return self.unpack(self.values[key])
+        if self.cache_dir:
+            path = self.get_path(key)
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    value = (data['contour'], data['points'], data['lengths'])
+                self.add(key, value)
+                self.disk_hits += 1
+                return self.unpack(value)
+        self.misses += 1
+        return None
+
+    def put(self, key, contour, points_in_contour):
+        """
+        Adds value to cache
+
+        Parameters
+        ---------
+        key: tuple, required
+            Key of value, see make_key
+
+        contour: numpy.array, required
+            Petal contour
+
+        points_in_contour: list, required
+            Points inside contour in filling order
+        """
+        lengths = np.array([len(row) for row in points_in_contour], dtype=np.int64)
+        points = (np.concatenate(points_in_contour).astype(np.int32) if len(lengths)
+                  else np.zeros((0, 2), dtype=np.int32))
+        value = (np.asarray(contour, dtype=np.int32), points, lengths)
+        self.add(key, value)
+        if self.cache_dir:
+            path = self.get_path(key)
+            # write to temporary file first, other processes can read the same path
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.npz')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, contour=value[0], points=value[1], lengths=value[2])
+            os.replace(tmp_path, path)
+
+    def add(self, key, value):
+        for arr in value:
+            arr.setflags(write=False)
+        if key in self.values:
+            self.nbytes -= sum(arr.nbytes for arr in self.values.pop(key))
+        self.values[key] = value
+        self.nbytes += sum(arr.nbytes for arr in value)
+        while self.nbytes > self.max_bytes and len(self.values) > 1:
+            _, old = self.values.popitem(last=False)
+            self.nbytes -= sum(arr.nbytes for arr in old)
+
+    def unpack(self, value):
+        contour, points, lengths = value
+        return contour, np.split(points, np.cumsum(lengths)[:-1]) if len(lengths) else []
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.npz')
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns
+        ----------
+        dict:
+            hits, disk_hits, misses, count of values and size of values in memory
+        """
+        return {'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'count': len(self.values),
+                'nbytes': self.nbytes}
@@ -1,5 +1,8 @@
 import numpy as np
 import cv2
+from rng import make_rng, rand, randint
+from gradient import GRADIENTS
+import colormap
 
 class Colorer():
     """
@@ -8,10 +11,45 @@ class Colorer():
     Finds contour point in predefined order
     Gradient fill prepared array of points.
 
+    Parameters
+    ---------
+    fill_type: str
+        Gradient filling type, can be 'top_down', 'diagonal' or 'center'
+        
+    batched: bool
+        Fill all points of petal at once with numpy, default=True.
+        If False, points are filled one by one
+        
+    rng: None or int or numpy.random.Generator
+        Random generator or its seed, None means global numpy random state, default=None
+        
+    dtype: numpy.dtype
+        Type of image values, colors are in [0,1] for float types and 
+        in [0,max value] for integer types (0-255 for uint8), default=numpy.float64
+        
+    engine: str
+        'points' - points of petal are found in filling order and filled one by one with neighbours,
+        'analytic' - gradient parameter of every petal pixel is computed from its coordinates
+        (see gradient.GRADIENTS) and mapped to colors at once, default='points'.
+        Analytic filling doesn't keep point lists, gradients are smooth but not the same as 'points' ones
+        
+    drop_outside: bool
+        Points and neighbours out of image are not filled, default=False (IndexError is raised,
+        negative indices are counted from the image end as numpy does)
+
     Attributes
     ---------
     color_dict: dict
-        Min and max values to generate some froup of colors (colormap)
+        Min and max values to generate some froup of colors (colormap), see add_colormap
+        
+    luts: colormap.LutCache
+        Gradient tables of analytic engine, shared by all colorers
+        
+    RAYS_CHUNK: int
+        Count of rays from center, that are walked at once in 'center' filling
+        
+    LUT_SIZE: int
+        Count of colors in gradient of analytic engine
     """
     color_dict = {'hot':{'min':[3,3,0],
                              'max':[11,10,1]},
@@ -21,9 +59,35 @@ class Colorer():
                              'max':[11,3,11]},
                   'green':{'min':[0,3,0],
                             'max':[8,11,8]}}
+    RAYS_CHUNK = 256
+    LUT_SIZE = 256
+    luts = colormap.LutCache()
+    # neighbours of point for gradient filling:
+    # (row shift, column shift, checked row shift, checked column shift, check)
+    GRAD_NEIGHBOURS = ((0,0,0,0,'all'),
+                       (1,1,1,1,'all'),
+                       (1,0,1,0,'red'))
+    GRAD_DIFF_NEIGHBOURS = ((0,0,0,0,'all'),
+                            (1,1,1,1,'all'),
+                            (1,0,1,0,'red'),
+                            (0,1,0,1,'all'),
+                            (-1,-1,-1,-1,'all'),
+                            (-1,0,-1,0,'red'),
+                            (0,-1,0,-1,'all'),
+                            (-1,1,-1,0,'red+1'),
+                            (1,-1,1,-1,'all'))
+    # pixel states for filling
+    FILL, RED, DEAD = 0, 1, 2
 
-    def __init__(self, fill_type):
+    def __init__(self, fill_type, batched=True, rng=None, dtype=np.float64, engine='points', drop_outside=False):
+        if engine not in ('points', 'analytic'):
+            raise ValueError("engine should be 'points' or 'analytic', not %r" % engine)
         self.fill_type = fill_type
+        self.batched = batched
+        self.drop_outside = drop_outside
+        self.engine = engine
+        self.rng = make_rng(rng)
+        self.dtype = np.dtype(dtype)
         self.gradient_fill = {'top_down':{'get_points':self.get_cntr_points,
                                  'fill':self.fill_grad},
                             'diagonal':{'get_points':self.get_cntr_points_center,
@@ -31,41 +95,104 @@ class Colorer():
                             'center':{'get_points':self.get_cntr_points_from_center,
                                  'fill':self.fill_grad_diff}}
         
-    def get_points(self,*args):
-        return self.gradient_fill[self.fill_type]['get_points'](*args)
+    def get_points(self, contour, img_size, center=None):
+        if self.engine == 'analytic':
+            return self.get_frame(contour, img_size, center)
+        get_points = self.gradient_fill[self.fill_type]['get_points']
+        if center is None:
+            return get_points(contour, img_size)
+        return get_points(contour, img_size, center)
+    
+    def get_center(self, img_size):
+        """
+        Random center coordinate for filling from center
+
+        Parameters
+        ---------
+        img_size: int, required
+            The image size, where petal should be drawn
+            
+        Returns
+        ----------
+        int:
+            row and column of center point
+        """
+        half_img_size = int(np.round(img_size/3))
+        return randint(self.rng, half_img_size,2*half_img_size)
     
-    def fill(self,*args):
-        self.gradient_fill[self.fill_type]['fill'](*args)
+    def fill(self, *args, **kwargs):
+        if self.engine == 'analytic':
+            self.fill_analytic(*args, **kwargs)
+            return
+        self.gradient_fill[self.fill_type]['fill'](*args, **kwargs)
     
     def get_random_colors(self, colors_cnt=3):
         random_colors = []
         for i in range(colors_cnt):
-            random_colors.append([np.random.rand() for i in range(3)])
+            random_colors.append([rand(self.rng) for i in range(3)])
         return random_colors
     
+    @classmethod
+    def add_colormap(cls, name, color_min, color_max):
+        """
+        Adds colormap, which can be used as grad_colors of Flower.draw like predefined ones
+
+        Parameters
+        ---------
+        name: str, required
+            Colormap name
+            
+        color_min: list, required
+            Min values of RGB channels from 0 to 10
+            
+        color_max: list, required
+            Max values of RGB channels from 1 to 11 (exclusive)
+        """
+        if len(color_min) != 3 or len(color_max) != 3:
+            raise ValueError('color_min and color_max should have 3 values')
+        if any(low >= high for low, high in zip(color_min, color_max)):
+            raise ValueError('color_min should be less than color_max')
+        cls.color_dict[name] = {'min': [int(c) for c in color_min], 'max': [int(c) for c in color_max]}
+    
     def get_colors(self, colormap, colors_cnt=3):
         colors = []
         for i in range(colors_cnt):
-            color = [np.random.randint(self.color_dict[colormap]['min'][0],
-                                            self.color_dict[colormap]['max'][0])/10,
-                          np.random.randint(self.color_dict[colormap]['min'][1],
-                                            self.color_dict[colormap]['max'][1])/10,
-                          np.random.randint(self.color_dict[colormap]['min'][2],
-                                            self.color_dict[colormap]['max'][2])/10]
+            color = [randint(self.rng, self.color_dict[colormap]['min'][0],
+                             self.color_dict[colormap]['max'][0])/10,
+                     randint(self.rng, self.color_dict[colormap]['min'][1],
+                             self.color_dict[colormap]['max'][1])/10,
+                     randint(self.rng, self.color_dict[colormap]['min'][2],
+                             self.color_dict[colormap]['max'][2])/10]
             if colormap == 'hot':
                 if color[1] > color[0]:
                     color[1],color[0] = color[0],color[1]
             colors.append(color)
         return colors
     
+    def to_dtype(self, colors):
+        """
+        Converts colors from [0,1] to image type
+
+        Parameters
+        ---------
+        colors: list or numpy.array, required
+            Color or colors with values in [0,1]
+            
+        Returns
+        ----------
+        numpy.array:
+            colors of image type, values are in [0,max value] for integer types
+        """
+        return colormap.to_dtype(colors, self.dtype)
+    
     def split_colors(self, color_count, color_from, color_to):
         """
         Split colors for gradient filling depends on color count
 
         Parameters
         ---------
-        color_count: int, required
-            Color count, for example in row or some area
+        color_count: int or list, required
+            Color count, for example in row or some area, or list of counts of many gradients
             
         color_from: list or tuple, required
             First color of gradient filling
@@ -75,25 +202,95 @@ class Colorer():
             
         Returns
         ----------
-        list:
-            list of colors for gradient filling
+        numpy.array:
+            exactly color_count colors for gradient filling (all gradients one after another 
+            for list of counts) with shape (colors count, 3), converted to image type
         """
-        colors = []
-        for c in range(3):#RGB
-            step = np.abs(color_from[c] - color_to[c])/color_count
-            if step:
-                if color_from[c]>color_to[c]:
-                    color = np.arange(color_from[c],color_to[c],-step)
-                else:
-                    color = np.arange(color_from[c],color_to[c],step)
-            else:
-                color = [color_from[c] for i in np.arange(color_count)]
+        return self.to_dtype(colormap.split_colors(color_count, color_from, color_to))
 
+    
+    def get_cntr_mask(self, contour, img_size):
+        """
+        Finds all points strictly inside the contour.
+        The contour is rasterized once, only pixels near the contour border are checked
+        with cv2.pointPolygonTest, so the result is the same as testing every pixel
 
-            colors.append(color)
-        colors = [(a,b,c) for a,b,c in zip(colors[0],colors[1],colors[2])]
-        return colors
+        Parameters
+        ---------
+        contour: numpy.array, required
+            The countour to find points in
+            
+        img_size: int, required
+            The image size, where petal should be drawn
+            
+        Returns
+        ----------
+        numpy.array:
+            bool mask with shape (img_size, img_size), indexed as [row, col]
+        """
+        box_mask, row0, col0 = self.get_cntr_box_mask(contour, img_size)
+        mask = np.zeros((img_size, img_size), dtype=bool)
+        mask[row0:row0+box_mask.shape[0], col0:col0+box_mask.shape[1]] = box_mask
+        return mask
+    
+    def get_cntr_box_mask(self, contour, img_size):
+        """
+        Finds all points strictly inside the contour in bounding box of contour,
+        so the cost depends on petal size, not on image size, see get_cntr_mask
+
+        Parameters
+        ---------
+        contour: numpy.array, required
+            The countour to find points in
+            
+        img_size: int, required
+            The image size, where petal should be drawn
+            
+        Returns
+        ----------
+        tuple:
+            bool mask of bounding box indexed as [row, col], first row and first column of box
+        """
+        contour = np.asarray(contour, dtype=np.int32).reshape(-1, 1, 2)
+        row0, col0 = np.maximum(contour.min(axis=(0, 1)), 0)
+        row1, col1 = np.minimum(contour.max(axis=(0, 1)) + 1, img_size)
+        if row1 <= row0 or col1 <= col0:
+            return np.zeros((0, 0), dtype=bool), 0, 0
+        # one pixel padding, so contour parts outside the box are rasterized too
+        fill = np.zeros((col1 - col0 + 2, row1 - row0 + 2), np.uint8)
+        cv2.fillPoly(fill, [contour], 1, offset=(1 - int(row0), 1 - int(col0)))
+        border = np.zeros_like(fill)
+        cv2.polylines(border, [contour + (1 - np.array([row0, col0], dtype=np.int32))], True, 1)
+        border = cv2.dilate(border, np.ones((3, 3), np.uint8))
+        fill, border = fill[1:-1, 1:-1], border[1:-1, 1:-1]
 
+        mask = (fill > 0) & (border == 0)
+        # pixels near the contour border are tested exactly
+        for col, row in zip(*np.nonzero(border)):
+            if cv2.pointPolygonTest(contour, (int(row + row0), int(col + col0)), False) > 0:
+                mask[col, row] = True
+        return mask.T, int(row0), int(col0)
+
+    def split_points(self, points, keys):
+        """
+        Splits ordered points into lists, where the key value is the same
+
+        Parameters
+        ---------
+        points: numpy.array, required
+            Ordered points with shape (N, 2)
+            
+        keys: numpy.array, required
+            Key value for each point
+            
+        Returns
+        ----------
+        list:
+            list of numpy.array with points
+        """
+        if not len(points):
+            return []
+        return np.split(points, np.flatnonzero(np.diff(keys)) + 1)
     
     def get_cntr_points(self, contour, img_size):
         """
@@ -112,20 +309,11 @@ class Colorer():
         list:
             points in contour in predefined order
         """
-        res_arr = []
-        # for each row
-        for row in range(img_size):
-            tmp_arr = []
-            # for each column
-            for col in range(img_size):
-                # if point in contour
-                if cv2.pointPolygonTest(contour,(row,col),True)> 0:
-                    # add point to current line
-                    tmp_arr.append([row,col])
-            if len(tmp_arr):
-                # add current line to result array
-                res_arr.append(tmp_arr)
-        return res_arr
+        # nonzero returns points ordered by row, then by column
+        mask, row0, col0 = self.get_cntr_box_mask(contour, img_size)
+        rows, cols = np.nonzero(mask)
+        rows, cols = rows + row0, cols + col0
+        return self.split_points(np.stack([rows, cols], axis=1), rows)
     
     def get_cntr_points_center(self, contour, img_size):
         """
@@ -144,36 +332,26 @@ class Colorer():
         list:
             points in contour in predefined order
         """
+        mask, row0, col0 = self.get_cntr_box_mask(contour, img_size)
+        rows, cols = np.nonzero(mask)
+        rows, cols = rows + row0, cols + col0
+        diags = rows + cols
         res_arr = []
         
-        # first border line
-        for row in range(img_size):
-            tmp_arr = []
-            curr_row = row
-            curr_col = 0
-            while curr_row != -1:
-                if cv2.pointPolygonTest(contour,(curr_row,curr_col),True)> 0:
-                    tmp_arr.append([curr_row,curr_col])
-                curr_row = curr_row -1
-                curr_col = curr_col +1
-            if len(tmp_arr):
-                res_arr.append(tmp_arr)
-              
-        # second border line
-        for row in range(img_size):
-            tmp_arr = []
-            curr_row = row
-            curr_col = img_size -1
-            while curr_row != img_size:
-                if cv2.pointPolygonTest(contour,(curr_row,curr_col),True)> 0:
-                    tmp_arr.append([curr_row,curr_col])
-                curr_row = curr_row +1
-                curr_col = curr_col -1
-            if len(tmp_arr):
-                res_arr.append(tmp_arr)
+        # first border line, anti-diagonals from top left corner, row goes down
+        part = diags <= img_size - 1
+        order = np.lexsort((-rows[part], diags[part]))
+        points = np.stack([rows[part], cols[part]], axis=1)[order]
+        res_arr += self.split_points(points, diags[part][order])
+        
+        # second border line, anti-diagonals to bottom right corner, row goes up
+        part = diags >= img_size - 1
+        order = np.lexsort((rows[part], diags[part]))
+        points = np.stack([rows[part], cols[part]], axis=1)[order]
+        res_arr += self.split_points(points, diags[part][order])
         return res_arr
     
-    def get_cntr_points_from_center(self, contour, img_size):
+    def get_cntr_points_from_center(self, contour, img_size, diag_coord=None):
         """
         Finds the points in order from center of countour to image border
 
@@ -185,85 +363,365 @@ class Colorer():
         img_size: int, required
             The image size, where petal should be drawn
             
+        diag_coord: int
+            Row and column of center point, default=None (random, see get_center)
+            
         Returns
         ----------
         list:
             points in contour in predefined order
         """
         res_arr = []
-        half_img_size = int(np.round(img_size/3))
-        diag_coord = np.random.randint(half_img_size,2*half_img_size)
+        if diag_coord is None:
+            diag_coord = self.get_center(img_size)
+        mask, row0, col0 = self.get_cntr_box_mask(contour, img_size)
+        box_start = np.array([row0, col0])
+        box_end = box_start + mask.shape
         # find the center point
-        center_point = [diag_coord,diag_coord]
+        center_point = np.array([diag_coord,diag_coord])
         # define all borders point
-        border = ([[0,i] for i in np.arange(0,img_size)] + 
-                 [[img_size,i] for i in np.arange(0,img_size)] +
-                    [[i,0] for i in np.arange(0,img_size)] + 
-                 [[i,img_size] for i in np.arange(0,img_size)])
-        for point in border:
-            tmp_res = []
-            row_diff = point[0] - center_point[0]
-            col_diff = point[1] - center_point[1]
-            # find the distance between center point and border point
-            dist = int(np.round(np.sqrt(row_diff*row_diff+col_diff*col_diff)))
-            # find steps for row and column to go from center to border
-            row_step = row_diff/dist
-            col_step = col_diff/dist
-            
-            row_diff = center_point[0]
-            col_diff = center_point[1]
-            c_point = [int(np.round(row_diff)),
-                        int(np.round(col_diff))]
-
-            # go from center to border until points inside image
-            while ((c_point[0]>= 0) 
-                   and (c_point[0] < img_size) 
-                   and (c_point[1]>= 0) 
-                   and (c_point[1] < img_size)):
-                if cv2.pointPolygonTest(contour,(c_point[0],c_point[1]),True)> 0:
-                    tmp_res.append(c_point)
-                row_diff = row_diff + row_step
-                col_diff = col_diff + col_step
-                c_point = [int(np.round(row_diff)),
-                           int(np.round(col_diff))]
-            if len(tmp_res):
-                res_arr.append(tmp_res)
+        line = np.arange(0,img_size)
+        border = np.concatenate([np.stack([np.zeros_like(line), line], axis=1),
+                                 np.stack([np.full_like(line, img_size), line], axis=1),
+                                 np.stack([line, np.zeros_like(line)], axis=1),
+                                 np.stack([line, np.full_like(line, img_size)], axis=1)])
+        diff = border - center_point
+        # find the distance between center point and border point
+        dist = np.round(np.sqrt(diff[:,0]*diff[:,0] + diff[:,1]*diff[:,1])).astype(int)
+        # find steps for row and column to go from center to border
+        steps = diff/dist[:,None]
+        # every ray leaves the contour box before this step count
+        corners = np.stack(np.meshgrid([row0, box_end[0]], [col0, box_end[1]]), axis=-1).reshape(-1, 2)
+        max_dist = np.sqrt(((corners - center_point)**2).sum(axis=1)).max()
+        min_step = np.sqrt((steps**2).sum(axis=1)).min()
+        steps_cnt = int(np.ceil(max_dist/min_step)) + 2
+        
+        # rays are processed in chunks to limit memory
+        for chunk in range(0, len(steps), self.RAYS_CHUNK):
+            step = steps[chunk:chunk+self.RAYS_CHUNK]
+            # go from center to border, accumulating steps as the point walk does
+            walk = np.empty((len(step), steps_cnt, 2))
+            walk[:,0] = center_point
+            walk[:,1:] = step[:,None]
+            walk = np.round(np.cumsum(walk, axis=1)).astype(int)
+            inside = np.all((walk >= 0) & (walk < img_size), axis=2)
+            # points after the first point outside image are not visited
+            inside = np.logical_and.accumulate(inside, axis=1)
+            inside &= np.all((walk >= box_start) & (walk < box_end), axis=2)
+            local = np.where(inside[:,:,None], walk - box_start, 0)
+            inside &= mask[local[:,:,0], local[:,:,1]]
+            rays, idx = np.nonzero(inside)
+            res_arr += self.split_points(walk[rays, idx], rays)
         return res_arr
     
-    def fill_grad(self,img, contour, points, color_from, color_to, fill_color):
-        color_count = len(points)
-        colors = self.split_colors(color_count,color_from,color_to)
+    def get_frame(self, contour, img_size, center=None):
+        """
+        Points of petal frame for analytic engine: origin, ends of both axes and gradient center.
+        Frame is placed on image with the petal, so gradient parameter is computed in petal coordinates
+
+        Parameters
+        ---------
+        contour: numpy.array, required
+            The countour of petal
+            
+        img_size: int, required
+            The image size, where petal should be drawn, it is the length of frame axes
+            
+        center: int
+            Row and column of center point, default=None (random for 'center' filling, see get_center)
+            
+        Returns
+        ----------
+        list:
+            one numpy.array with 4 points, in format of get_points
+        """
+        if center is None:
+            center = self.get_center(img_size) if self.fill_type == 'center' else 0
+        return [np.array([[0, 0], [img_size, 0], [0, img_size], [center, center]])]
+    
+    def palette_counts(self, points):
+        """
+        Lengths of gradients, which are used to fill petal with points, see get_palette
+
+        Parameters
+        ---------
+        points: list, required
+            Points of petal, see get_points
+            
+        Returns
+        ----------
+        numpy.array or None:
+            count of rows for 'top_down' and 'diagonal', unique line lengths for 'center',
+            None for analytic engine (gradient table is used)
+        """
+        if self.engine == 'analytic':
+            return None
+        if self.fill_type == 'center':
+            return np.unique([len(line) for line in points]).astype(int)
+        return np.array([len(points)])
+    
+    def get_palette(self, counts, color_from, color_to):
+        """
+        All colors of petal gradients with shape (colors count, 3), converted to image type
+
+        Parameters
+        ---------
+        counts: numpy.array or None, required
+            Lengths of gradients, see palette_counts
+            
+        color_from: list or tuple, required
+            First color of gradient filling
+            
+        color_to: list or tuple, required
+            Second color of gradient filling
+        """
+        if counts is None:
+            return self.get_lut(color_from, color_to)
+        return self.split_colors(counts, color_from, color_to)
+    
+    def get_lut(self, color_from, color_to):
+        """
+        Gradient colors for analytic engine with shape (LUT_SIZE, 3), converted to image type
+        """
+        return self.luts.get(color_from, color_to, self.LUT_SIZE, self.dtype)
+    
+    def fill_analytic(self, img, contour, points, color_from, color_to, fill_color, index=None, offset=0):
+        """
+        Fills petal pixels, which have the fill color, by gradient parameter of their coordinates
 
-        for i,row in enumerate(points):
-            color = colors[i]
-            for point in row:
-                if (all(img[point[1], point[0]] ==fill_color)):
-                    img[point[1], point[0]] = color
-                if (all(img[point[1]+1, point[0]+1] ==fill_color)):
-                    img[point[1]+1, point[0]+1] = color
-                if (all(img[point[1]+1, point[0]][0] ==fill_color)):
-                    img[point[1]+1, point[0]] = color
+        Parameters
+        ---------
+        img: numpy.array, required
+            Image to fill
+            
+        contour: numpy.array, required
+            Petal contour on image, points are [column, row] of image
+            
+        points: list, required
+            Petal frame on image, see get_frame
+            
+        color_from: list or tuple, required
+            First color of gradient filling
+            
+        color_to: list or tuple, required
+            Second color of gradient filling
+            
+        fill_color: tuple, required
+            Color of petal filling before gradient filling
+            
+        index: numpy.array
+            Map of image shape to write offset + gradient color index of filled pixels, default=None
+            
+        offset: int
+            Offset of color indices in index, default=0
+        """
+        contour = np.asarray(contour, dtype=np.int32).reshape(-1, 1, 2)
+        col0, row0 = np.maximum(contour.min(axis=(0, 1)), 0)
+        col1, row1 = np.minimum(contour.max(axis=(0, 1)) + 1, img.shape[1::-1])
+        if row1 <= row0 or col1 <= col0:
+            return
+        box = img[row0:row1, col0:col1]
+        mask = np.zeros(box.shape[:2], np.uint8)
+        cv2.fillPoly(mask, [contour], 1, offset=(-int(col0), -int(row0)))
+        mask = (mask > 0) & np.all(box == np.asarray(fill_color, dtype=img.dtype), axis=2)
+        rows, cols = np.nonzero(mask)
+        if not len(rows):
+            return
+        # image coordinates to petal frame coordinates
+        origin, axis_x, axis_y, center = np.asarray(points[0], dtype=np.float64)
+        axes = np.stack([axis_x - origin, axis_y - origin])
+        size = np.sqrt((axes[0]**2).sum())
+        coords = np.stack([cols + col0, rows + row0], axis=1) - origin
+        coords = np.linalg.solve(axes.T, coords.T).T*size
+        center = np.linalg.solve(axes.T, center - origin)*size
+        
+        t = GRADIENTS[self.fill_type](coords, mask, center)
+        idx = np.round(np.clip(t, 0, 1)*(self.LUT_SIZE - 1)).astype(int)
+        box[rows, cols] = self.get_lut(color_from, color_to)[idx]
+        if index is not None:
+            index[row0:row1, col0:col1][rows, cols] = offset + idx
+    
+    def fill_grad(self,img, contour, points, color_from, color_to, fill_color, index=None, offset=0):
+        colors = self.get_palette(self.palette_counts(points),color_from,color_to)
+        # every row has its own color
+        color_idx = [np.full(len(row), i) for i,row in enumerate(points)]
+        self.fill_points(img, points, color_idx, colors, self.GRAD_NEIGHBOURS, fill_color, index, offset)
                     
-    def fill_grad_diff(self, img, contour, points, color_from, color_to, fill_color):
-        for i,line in enumerate(points):
-            color_count = len(line)
-            colors = self.split_colors(color_count,color_from,color_to)
-            for i,point in enumerate(line):
-                if (all(img[point[1], point[0]] ==fill_color)):
-                    img[point[1], point[0]] = colors[i]
-                if (all(img[point[1]+1, point[0]+1] ==fill_color)):
-                    img[point[1]+1, point[0]+1] = colors[i]
-                if (all(img[point[1]+1, point[0]][0] ==fill_color)):
-                    img[point[1]+1, point[0]] = colors[i]
-                if (all(img[point[1], point[0]+1] ==fill_color)):
-                    img[point[1], point[0]+1] = colors[i]
-                if (all(img[point[1]-1, point[0]-1] ==fill_color)):
-                    img[point[1]-1, point[0]-1] = colors[i]
-                if (all(img[point[1]-1, point[0]][0] ==fill_color)):
-                    img[point[1]-1, point[0]] = colors[i]
-                if (all(img[point[1], point[0]-1] ==fill_color)):
-                    img[point[1], point[0]-1] = colors[i]
-                if (all(img[point[1]-1, point[0]][0]+1 ==fill_color)):
-                    img[point[1]-1, point[0]+1] = colors[i]
-                if (all(img[point[1]+1, point[0]-1] ==fill_color)):
-                    img[point[1]+1, point[0]-1] = colors[i]
\ No newline at end of file
+    def fill_grad_diff(self, img, contour, points, color_from, color_to, fill_color, index=None, offset=0):
+        # every line has its own gradient, lines with the same length share colors
+        lengths = np.array([len(line) for line in points], dtype=int)
+        unique, inverse = np.unique(lengths, return_inverse=True)
+        colors = self.get_palette(unique, color_from, color_to)
+        offsets = np.cumsum(unique) - unique
+        color_idx = [offsets[i] + np.arange(length) for i, length in zip(inverse, lengths)]
+        self.fill_points(img, points, color_idx, colors, self.GRAD_DIFF_NEIGHBOURS, fill_color, index, offset)
+
+    def fill_points(self, img, points, color_idx, colors, neighbours, fill_color, index=None, offset=0):
+        """
+        Fills points and their neighbours with colors, point by point in order.
+        Pixel is filled only if it still has the fill color (or the red channel of fill color
+        for 'red' checks), so first point in order wins
+
+        Parameters
+        ---------
+        img: numpy.array, required
+            Image to fill
+            
+        points: list, required
+            Lists of points in order, points are [column, row] of image
+            
+        color_idx: list, required
+            Lists of color index for each point
+            
+        colors: numpy.array, required
+            Colors to fill with shape (colors count, 3)
+            
+        neighbours: tuple, required
+            (row shift, column shift, checked row shift, checked column shift, check)
+            for each neighbour of point, check can be 'all', 'red' or 'red+1'
+            ('red+1' adds the max image value, 1 for float image)
+            
+        fill_color: tuple, required
+            Color of petal filling before gradient filling
+            
+        index: numpy.array
+            Map of image shape to write offset + color index of filled pixels, default=None
+            
+        offset: int
+            Offset of color indices in index, default=0
+        """
+        if not len(points):
+            return
+        points = np.concatenate(points).astype(int)
+        color_idx = np.concatenate(color_idx).astype(int)
+        fill_color = np.asarray(fill_color)
+        neighbours_cnt = len(neighbours)
+        shift = np.array([n[:2] for n in neighbours])
+        check_shift = np.array([n[2:4] for n in neighbours])
+        check = np.array([n[4] for n in neighbours])
+        # image indices for every point and neighbour, in order of filling
+        rows = (points[:,1,None] + shift[:,0]).ravel()
+        cols = (points[:,0,None] + shift[:,1]).ravel()
+        check_rows = (points[:,1,None] + check_shift[:,0]).ravel()
+        check_cols = (points[:,0,None] + check_shift[:,1]).ravel()
+        check = np.tile(check, len(points))
+        write_colors = np.repeat(color_idx, neighbours_cnt)
+        if self.drop_outside:
+            inside = np.ones(len(rows), dtype=bool)
+            for idx, size in ((rows, img.shape[0]), (cols, img.shape[1]),
+                              (check_rows, img.shape[0]), (check_cols, img.shape[1])):
+                inside &= (idx >= 0) & (idx < size)
+            if not inside.any():
+                return
+            rows, cols = rows[inside], cols[inside]
+            check_rows, check_cols = check_rows[inside], check_cols[inside]
+            check, write_colors = check[inside], write_colors[inside]
+        for idx, size in ((check_rows, img.shape[0]), (check_cols, img.shape[1])):
+            if np.any((idx < -size) | (idx >= size)):
+                raise IndexError('index is out of bounds for image with size %d' % size)
+        if color_idx.max() >= len(colors):
+            raise IndexError('color index is out of bounds for %d colors' % len(colors))
+        if not self.batched:
+            self.fill_points_loop(img, points, color_idx, colors, neighbours, fill_color, index, offset)
+            return
+
+        # all components of fill color should be the same for 'red' checks
+        uniform = bool(np.all(fill_color == fill_color[0]))
+        if uniform and 'red+1' in check:
+            one = float(self.to_dtype(1))
+            plus_checked = img[check_rows[check == 'red+1'], check_cols[check == 'red+1'], 0]
+            if (np.any(colors[:,0].astype(np.float64) + one == fill_color[0]) 
+                or np.any(plus_checked.astype(np.float64) + one == fill_color[0])):
+                self.fill_points_loop(img, points, color_idx, colors, neighbours, fill_color, index, offset)
+                return
+        # 'red+1' check can't be passed, 'red' check can't be passed with not uniform fill color
+        used = (check == 'all') | ((check == 'red') & uniform)
+        rows, cols = rows[used] % img.shape[0], cols[used] % img.shape[1]
+        write_colors, red = write_colors[used], check[used] == 'red'
+
+        # every pixel is filled by the first write in order, which check is passed
+        target = rows*img.shape[1] + cols
+        order = np.argsort(target, kind='stable')
+        target, write_colors, red = target[order], write_colors[order], red[order]
+        first = np.flatnonzero(np.r_[True, target[1:] != target[:-1]])
+        end = np.r_[first[1:], len(target)]
+        rows, cols = np.divmod(target[first], img.shape[1])
+        state = self.fill_state(img[rows, cols], fill_color, uniform)
+        write_state = self.fill_state(colors, fill_color, uniform)[write_colors]
+        
+        # next write, which changes the pixel state
+        writes_cnt = len(target)
+        write_num = np.arange(writes_cnt)
+        next_not_fill = np.minimum.accumulate(
+            np.where(write_state != self.FILL, write_num, writes_cnt)[::-1])[::-1]
+        next_red_not_red = np.minimum.accumulate(
+            np.where(red & (write_state != self.RED), write_num, writes_cnt)[::-1])[::-1]
+        prev_red_red = np.maximum.accumulate(np.where(red & (write_state == self.RED), write_num, -1))
+        
+        fired = np.full(len(first), -1)
+        pos = first.copy()
+        active = np.flatnonzero(state != self.DEAD)
+        while len(active):
+            curr_pos = pos[active]
+            curr_end = end[active]
+            is_fill = state[active] == self.FILL
+            nxt = np.minimum(np.where(is_fill, 
+                                      next_not_fill[np.minimum(curr_pos, writes_cnt - 1)],
+                                      next_red_not_red[np.minimum(curr_pos, writes_cnt - 1)]),
+                             curr_end)
+            nxt = np.where(curr_pos < curr_end, nxt, curr_end)
+            # writes with the red checks, which keep the red channel, are passed before the next state change
+            prev = prev_red_red[np.maximum(nxt - 1, 0)]
+            keep_red = ~is_fill & (prev >= curr_pos) & (nxt > curr_pos)
+            fired[active[keep_red]] = prev[keep_red]
+            # writes with the fill color keep the fill state, the last of them is in index
+            keep_fill = is_fill & (nxt >= curr_end) & (curr_pos < curr_end)
+            fired[active[keep_fill]] = curr_end[keep_fill] - 1
+
+            change = nxt < curr_end
+            fired[active[change]] = nxt[change]
+            state[active[change]] = write_state[nxt[change]]
+            state[active[~change]] = self.DEAD
+            pos[active] = nxt + 1
+            active = active[state[active] != self.DEAD]
+            
+        filled = fired >= 0
+        img[rows[filled], cols[filled]] = colors[write_colors[fired[filled]]]
+        if index is not None:
+            index[rows[filled], cols[filled]] = offset + write_colors[fired[filled]]
+
+    def fill_state(self, colors, fill_color, uniform):
+        """
+        Finds the state of pixels for fill_points: FILL if pixel has fill color,
+        RED if only red channel is the same as fill color and DEAD otherwise
+        """
+        state = np.full(len(colors), self.DEAD, dtype=np.int8)
+        if uniform:
+            state[colors[:,0] == fill_color[0]] = self.RED
+        state[np.all(colors == fill_color, axis=1)] = self.FILL
+        return state
+    
+    def fill_points_loop(self, img, points, color_idx, colors, neighbours, fill_color, index=None, offset=0):
+        """
+        Fills points point by point, the same as fill_points, used when
+        the 'red+1' check can be passed
+        """
+        fill_color = tuple(fill_color)
+        # 1 is the max value of float image, it is 255 for uint8 image
+        one = float(self.to_dtype(1))
+        height, width = img.shape[:2]
+        for point, i in zip(points, color_idx):
+            for row, col, check_row, check_col, check in neighbours:
+                if self.drop_outside and not (0 <= point[1]+row < height and 0 <= point[0]+col < width
+                                              and 0 <= point[1]+check_row < height
+                                              and 0 <= point[0]+check_col < width):
+                    continue
+                checked = img[point[1]+check_row, point[0]+check_col]
+                if check == 'red':
+                    checked = checked[0]
+                elif check == 'red+1':
+                    checked = checked[0]+one
+                if (all(checked == fill_color)):
+                    img[point[1]+row, point[0]+col] = colors[i]
+                    if index is not None:
+                        index[point[1]+row, point[0]+col] = offset + i
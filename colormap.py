@@ -0,0 +1,108 @@
+from collections import OrderedDict
+import numpy as np
+
+
+def split_colors(color_counts, color_from, color_to):
+    """
+    Splits colors for gradients of many lengths at once.
+    Gradient of length n has the same values as numpy.arange from color_from to color_to
+    with step |color_to - color_from|/n, but always exactly n colors
+
+    Parameters
+    ---------
+    color_counts: int or list, required
+        Color count of every gradient
+
+    color_from: list or tuple, required
+        First color of gradient filling
+
+    color_to: list or tuple, required
+        Second color of gradient filling
+
+    Returns
+    ----------
+    numpy.array:
+        colors of all gradients one after another with shape (sum of color counts, 3)
+    """
+    color_counts = np.atleast_1d(np.asarray(color_counts, dtype=np.int64))
+    color_from = np.asarray(color_from, dtype=np.float64)[:3]
+    color_to = np.asarray(color_to, dtype=np.float64)[:3]
+    # step of every gradient and channel, computed as numpy.arange does
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step = np.abs(color_from - color_to)/color_counts[:, None]
+    step = np.where(color_from > color_to, -step, step)
+    delta = (color_from + step) - color_from
+    idx = np.arange(color_counts.sum()) - np.repeat(np.cumsum(color_counts) - color_counts, color_counts)
+    return color_from + idx[:, None]*np.repeat(delta, color_counts, axis=0)
+
+
+def to_dtype(colors, dtype):
+    """
+    Converts colors from [0,1] to dtype, values are in [0,max value] for integer types
+    """
+    colors = np.asarray(colors, dtype=np.float64)
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        max_value = np.iinfo(dtype).max
+        return np.clip(np.round(colors*max_value), 0, max_value).astype(dtype)
+    return colors.astype(dtype)
+
+
+def gradient_lut(color_from, color_to, size):
+    """
+    Linear gradient from color_from to color_to with size colors, shape (size, 3)
+    """
+    t = np.linspace(0, 1, size)[:, None]
+    return (1 - t)*np.asarray(color_from, dtype=np.float64)[:3] + t*np.asarray(color_to, dtype=np.float64)[:3]
+
+
+class LutCache():
+    """
+    Cache of gradient lookup tables, the last used tables are kept.
+    Named colormaps and user colors give (color_from, color_to) pairs,
+    so all of them share the same tables
+
+    Parameters
+    ---------
+    max_count: int
+        Max count of cached tables, default=4096
+    """
+    def __init__(self, max_count=4096):
+        self.max_count = max_count
+        self.values = OrderedDict()
+
+    def get(self, color_from, color_to, size, dtype=np.float64):
+        """
+        Gradient lookup table
+
+        Parameters
+        ---------
+        color_from: list or tuple, required
+            First color of gradient
+
+        color_to: list or tuple, required
+            Second color of gradient
+
+        size: int, required
+            Count of colors in table
+
+        dtype: numpy.dtype
+            Type of image, see to_dtype, default=numpy.float64
+
+        Returns
+        ----------
+        numpy.array:
+            read only table with shape (size, 3)
+        """
+        key = (tuple(float(c) for c in color_from[:3]), tuple(float(c) for c in color_to[:3]),
+               size, np.dtype(dtype).str)
+        lut = self.values.get(key)
+        if lut is not None:
+            self.values.move_to_end(key)
+            return lut
+        lut = to_dtype(gradient_lut(color_from, color_to, size), dtype)
+        lut.setflags(write=False)
+        self.values[key] = lut
+        if len(self.values) > self.max_count:
+            self.values.popitem(last=False)
+        return lut
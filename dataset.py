@@ -0,0 +1,217 @@
+import itertools
+import queue
+import threading
+import numpy as np
+from batch import draw_flower, MAX_RETRIES
+from cache import GeometryCache
+
+
+class FlowerDataset():
+    """
+    Iterable dataset, which draws flowers on the fly right into preallocated batch arrays.
+    Batch number i has the same flowers for the same seed, in any worker, so the stream
+    is split between workers by batch numbers. See to_torch for PyTorch DataLoader.
+
+    Parameters
+    ---------
+    batch_size: int
+        Count of flowers in batch, default=32
+
+    params: dict
+        Flower parameters, the same for all flowers, 'grad_colors' is passed to Flower.draw,
+        see batch.render_flower, default=None
+
+    spec: FlowerSpec
+        Spec to sample parameters of every flower, params are ignored, default=None
+
+    seed: int
+        Seed of dataset, default=None (random, but the same in all workers)
+
+    dtype: numpy.dtype
+        Type of images, numpy.uint8 or numpy.float32 for example, default=numpy.uint8
+
+    batches: int
+        Count of batches, default=None (endless stream)
+
+    prefetch: int
+        Count of batches drawn ahead in background thread, default=2 (0 - no background thread)
+
+    max_retries: int
+        Count of new seeds for flower, which petals are out of image, see batch.draw_flower,
+        default=batch.MAX_RETRIES
+
+    with_params: bool
+        Return parameters of flowers too, default=False
+
+    Yields
+    ----------
+    tuple:
+        images with shape (batch_size, img_size, img_size, 3), seeds of flowers
+        (and list of flower parameters). Images array is reused, it is valid until the next batch
+    """
+    def __init__(self, batch_size=32, params=None, spec=None, seed=None, dtype=np.uint8, batches=None,
+                 prefetch=2, max_retries=MAX_RETRIES, with_params=False):
+        self.batch_size = batch_size
+        self.params = dict(params or {})
+        self.spec = spec
+        # workers should have the same entropy to split the same stream
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.dtype = np.dtype(dtype)
+        self.batches = batches
+        self.prefetch = prefetch
+        self.max_retries = max_retries
+        self.with_params = with_params
+        self.cache = None
+        img_size = spec.img_size if spec is not None else self.params.get('img_size', 300)
+        self.shape = (batch_size, img_size, img_size, 3)
+
+    def __len__(self):
+        if self.batches is None:
+            raise TypeError('endless dataset has no length')
+        return self.batches
+
+    def __iter__(self):
+        return self.iterate()
+
+    def get_tasks(self, index):
+        """
+        Seeds and parameters of flowers of batch
+        """
+        seed_seq = np.random.SeedSequence(self.seed, spawn_key=(index,))
+        if self.spec is not None:
+            rows = self.spec.sample(self.batch_size, int(seed_seq.generate_state(1)[0]))
+            return rows['seed'], [self.spec.to_params(row) for row in rows]
+        return seed_seq.generate_state(self.batch_size), [self.params]*self.batch_size
+
+    def render_batch(self, index, out):
+        """
+        Draws flowers of batch
+
+        Parameters
+        ---------
+        index: int, required
+            Batch number
+
+        out: numpy.array, required
+            Array to draw in with shape and dtype of batch
+
+        Returns
+        ----------
+        tuple:
+            seeds of flowers and list of flower parameters
+        """
+        if self.cache is None:
+            self.cache = GeometryCache()
+        seeds, tasks = self.get_tasks(index)
+        seeds = np.array(seeds, dtype=np.uint32)
+        all_params = []
+        for i, (task_seed, params) in enumerate(zip(seeds, tasks)):
+            params = dict(params, dtype=self.dtype)
+            # supersampled flower is drawn on larger canvas and downsampled to batch
+            direct = params.get('supersample', 1) == 1
+            flower, task_seed = draw_flower(int(task_seed), params, self.cache,
+                                            out[i] if direct else None, self.max_retries)
+            if not direct:
+                out[i] = flower.img
+            seeds[i] = task_seed
+            if self.with_params:
+                all_params.append(dict(flower.get_params(), seed=task_seed))
+        return seeds, all_params
+
+    def iterate(self, worker_id=0, num_workers=1):
+        """
+        Batches of worker, worker takes every num_workers-th batch
+        """
+        indices = range(worker_id, self.batches, num_workers) if self.batches is not None \
+            else itertools.count(worker_id, num_workers)
+        if self.prefetch:
+            return self.iterate_prefetched(indices)
+        return self.iterate_batches(indices)
+
+    def iterate_batches(self, indices):
+        out = np.empty(self.shape, self.dtype)
+        for index in indices:
+            seeds, params = self.render_batch(index, out)
+            yield (out, seeds, params) if self.with_params else (out, seeds)
+
+    def iterate_prefetched(self, indices):
+        # queued batches, the drawn one and the yielded one
+        buffers = [np.empty(self.shape, self.dtype) for i in range(self.prefetch + 2)]
+        batches = queue.Queue(self.prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def work():
+            try:
+                for n, index in enumerate(indices):
+                    out = buffers[n % len(buffers)]
+                    if not put((out,) + self.render_batch(index, out)):
+                        return
+            except Exception as e:
+                put(e)
+                return
+            put(None)
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                out, seeds, params = item
+                yield (out, seeds, params) if self.with_params else (out, seeds)
+        finally:
+            stop.set()
+            thread.join()
+
+
+def to_torch(dataset, channels_first=False):
+    """
+    Wraps dataset into torch.utils.data.IterableDataset, batches are split between
+    DataLoader workers. Use DataLoader(to_torch(dataset), batch_size=None, num_workers=N),
+    images are torch tensors without copying
+
+    Parameters
+    ---------
+    dataset: FlowerDataset, required
+        Dataset of flowers
+
+    channels_first: bool
+        Return images with shape (N, 3, H, W), default=False (N, H, W, 3)
+
+    Returns
+    ----------
+    torch.utils.data.IterableDataset:
+        dataset of (images, seeds) tensors
+    """
+    import torch
+    from torch.utils.data import IterableDataset, get_worker_info
+
+    class TorchFlowerDataset(IterableDataset):
+        def __len__(self):
+            info = get_worker_info()
+            if info is None:
+                return len(dataset)
+            return len(range(info.id, len(dataset), info.num_workers))
+
+        def __iter__(self):
+            info = get_worker_info()
+            worker_id, num_workers = (0, 1) if info is None else (info.id, info.num_workers)
+            for item in dataset.iterate(worker_id, num_workers):
+                images = torch.from_numpy(item[0])
+                if channels_first:
+                    images = images.permute(0, 3, 1, 2)
+                yield (images, torch.from_numpy(item[1].astype(np.int64))) + tuple(item[2:])
+
+    return TorchFlowerDataset()
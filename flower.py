@@ -2,6 +2,8 @@ import numpy as np
 import cv2
 from petal import Petal
 from colorer import Colorer
+from rng import make_rng, randint
+from profiler import NullProfiler
 
 class Flower():
     """
@@ -39,6 +41,49 @@ class Flower():
         
     scale_x: list or int or 'random'
         List of scale_x values (to narrow or wide) for each level with length = levels_cnt, default='random'
+        
+    center_dist: list or int or 'random'
+        List of petal shifts to flower center for each level with length = levels_cnt, default='random'
+        
+    level_shrink: list or float or 'random'
+        List of ratios of next level size to level size for each level with length = levels_cnt,
+        default='random'
+        
+    rng: None or int or numpy.random.Generator
+        Random generator or its seed, None means global numpy random state, default=None
+        
+    cache: GeometryCache
+        Cache of petal contours and points inside them, default=None (no cache)
+        
+    petal_library: PetalLibrary
+        Library of precomputed petal contours, default=None (key points of Petal are smoothed)
+        
+    dtype: numpy.dtype
+        Type of image, colors are in [0,1] for float types and in [0,255] for uint8,
+        uint8 image takes 8 times less memory than float64 and can be saved without conversion,
+        default=numpy.float64
+        
+    profiler: Profiler
+        Profiler to measure drawing stages, default=None (nothing is measured)
+        
+    layered: bool
+        Draw every level on its own RGBA layer, which covers only level petals, 
+        and put it on image, default=False. Layers are kept in layers attribute.
+        Image is the same, except petals which touch image border
+        
+    supersample: int
+        Draw flower on k times larger canvas and downsample it with area interpolation
+        to smooth petal borders, default=1. Random values are the same for any k
+        (petal points, which are out of the finer canvas by a pixel, are not filled),
+        drawing time grows about k*k times (k=2 is 3-4 times slower, k=4 is 12-16 times slower),
+        but all work per pixel is done by numpy and OpenCV
+        
+    engine: str
+        Gradient filling engine 'points' or 'analytic', see Colorer, default='points'
+        
+    canvas: numpy.array
+        Array to draw flower in, with shape (img_size*supersample, img_size*supersample, 3) and dtype,
+        a slot of shared memory for example, it is filled with background, default=None (new array)
 
     Attributes
     ---------
@@ -49,14 +94,52 @@ class Flower():
         Colorer object make gradient filling and manage colors
         
     fill_color: tuple
-        Color to fill petal before making gradient filling
+        Color to fill petal before making gradient filling, converted to image type
         
     levels_cnt: int
         Flower levels count
         
+    rng: numpy.random.Generator or module
+        Random generator for all random choices of flower
+        
     img: numpy.array
         Image containing flower
         
+    canvas: numpy.array
+        Image, where flower is drawn, it is img if supersample is 1, 
+        otherwise it is supersample times larger
+        
+    colors: list
+        Gradient colors (from, to and border color) of each drawn level
+        
+    layers: list
+        RGBA layers of drawn levels in layered mode, dicts with
+        box (first column, first row, last column + 1, last row + 1) and rgba image
+        
+    label_map: numpy.array or None
+        uint16 instance map of drawn petals, 0 is background or center, 
+        petal number in drawing order starting from 1 otherwise, if draw is called with labels=True
+        
+    semantic_mask: numpy.array or None
+        uint8 mask with BACKGROUND, CENTER and PETAL values, if draw is called with labels=True
+        
+    geometry: dict or None
+        Record of drawing for recolor, if draw is called with record=True:
+        'index' - int32 map of canvas shape with index of pixel color in palette
+        (background, center, fill color and border and gradient colors of every level),
+        'levels' - placed petal contours in drawing order, gradient lengths and palette offsets of levels
+        
+    pyramid: dict or None
+        Images of flower by size, if draw is called with sizes
+        
+    label_pyramid: dict or None
+        label_map and semantic_mask of flower by size, if draw is called with sizes and labels=True
+        
+    instances: list or None
+        Drawn petals, dicts with instance id of label_map, level, petal number on level,
+        box (first column, first row, last column + 1, last row + 1) and polygon (contour points 
+        [column, row] with shape (N, 2)) on image, if draw is called with labels=True
+        
     img_size: int
         One number for square image, value of square side
         
@@ -79,13 +162,35 @@ class Flower():
         list : a list of petal scaling (narrow or wide) for each level
         int: means that on each level there will be same petal scaling
         'random': a list of random petal scaling for each level will be generated
+        
+    center_dist: list or 'random'
+        list : a list of petal shifts to flower center for each level
+        'random': a list of random shifts will be generated in every draw
+        
+    level_shrink: list or 'random'
+        list : a list of ratios of next level size to level size for each level
+        'random': a list of random ratios will be generated in every draw
+        
+    drawn_center_dist: list or None
+        Petal shifts to flower center of every level of the last draw
+        
+    drawn_level_shrink: list or None
+        Ratios of next level size to level size of every level of the last draw
     """
     PETAL_CNT_MAX = 7
     PETAL_CNT_MIN = 4
     SHIFT_DEGREE = 60
     SCALE_LEFT = 90
     SCALE_RIGHT = 100
+    CENTER_DIST_MIN = -10
+    CENTER_DIST_MAX = 10
+    SHRINK_MIN = 5
+    SHRINK_MAX = 8
     BORDER_DARKNESS = 2.5
+    # values of semantic mask
+    BACKGROUND, CENTER, PETAL = 0, 1, 2
+    # palette indices of geometry record
+    BACKGROUND_INDEX, CENTER_INDEX, FILL_INDEX = 0, 1, 2
     def __init__(self, 
                  img_size=300,
                  center_size=40,
@@ -96,80 +201,507 @@ class Flower():
                  petal_cnt='random',
                  petal_kinds='random',
                  scale='random',
-                 scale_x='random'):
-        self.petal = Petal()
-        self.colorer = Colorer(fill_type)
-        self.fill_color = fill_color
+                 scale_x='random',
+                 center_dist='random',
+                 level_shrink='random',
+                 rng=None,
+                 cache=None,
+                 petal_library=None,
+                 dtype=np.float64,
+                 profiler=None,
+                 layered=False,
+                 supersample=1,
+                 engine='points',
+                 canvas=None):
+        self.rng = make_rng(rng)
+        self.supersample = supersample
+        self.layered = layered
+        self.layers = []
+        self.cache = cache
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.dtype = np.dtype(dtype)
+        self.petal = Petal(petal_library)
+        # finer grid can put points and neighbours a pixel out of canvas, where they are in it
+        # without supersampling, they are dropped
+        self.colorer = Colorer(fill_type, rng=self.rng, dtype=self.dtype, engine=engine,
+                               drop_outside=supersample > 1)
+        self.fill_color = self.to_dtype(fill_color)
         self.levels_cnt = levels_cnt
-        self.img = np.ones((img_size,img_size,3))#RGB channels
+        self.colors = []
+        self.center_size = center_size
+        self.geometry = None
+        self.label_canvas = None
+        self.semantic_canvas = None
+        self.instances = None
+        self.drawn_center_dist = None
+        self.drawn_level_shrink = None
+        self.sizes = None
+        self.pyramid = None
+        self.label_pyramid = None
         self.img_size = img_size
+        self.render_size = img_size*supersample
+        if canvas is None:
+            canvas = np.full((self.render_size,self.render_size,3), self.colorer.to_dtype(1), 
+                             dtype=self.dtype)#RGB channels
+        else:
+            if canvas.shape != (self.render_size,self.render_size,3) or canvas.dtype != self.dtype:
+                raise ValueError('canvas should have shape %s and dtype %s, not %s and %s' 
+                                 % ((self.render_size,self.render_size,3), self.dtype, canvas.shape, canvas.dtype))
+            canvas[...] = self.colorer.to_dtype(1)
+        self.canvas = canvas
         self.make_center(center_color,center_size)
+        self.update_img()
         self.__parse_petal_count(petal_cnt)
         self.__parse_petal_kinds(petal_kinds)
         self.__parse_scale(scale)
         self.__parse_scale_x(scale_x)
+        self.__parse_center_dist(center_dist)
+        self.__parse_level_shrink(level_shrink)
         
     def make_center(self, color,center_size):
-        center_coordinate = int(np.round(self.img_size/2))
-        cv2.circle(self.img, (center_coordinate,center_coordinate), center_size, color,-1)
+        self.center_color = self.to_dtype(color)
+        center_coordinate = int(np.round(self.render_size/2))
+        cv2.circle(self.canvas, (center_coordinate,center_coordinate), center_size*self.supersample, 
+                   self.center_color,-1)
+        
+    def update_img(self):
+        """
+        Makes image from canvas, canvas is downsampled if supersample is more than 1
+        """
+        if self.supersample == 1:
+            self.img = self.canvas
+            self.label_map, self.semantic_mask = self.label_canvas, self.semantic_canvas
+        else:
+            size = (self.img_size, self.img_size)
+            self.img = cv2.resize(self.canvas, size, interpolation=cv2.INTER_AREA)
+            # labels can't be mixed, the nearest one is taken
+            self.label_map, self.semantic_mask = [
+                None if canvas is None else cv2.resize(canvas, size, interpolation=cv2.INTER_NEAREST_EXACT)
+                for canvas in (self.label_canvas, self.semantic_canvas)]
+        if self.sizes:
+            with self.profiler.stage('pyramid'):
+                self.update_pyramid()
+
+    def update_pyramid(self):
+        """
+        Makes images of pyramid sizes from canvas, see draw
+        """
+        self.pyramid, self.label_pyramid = {}, None if self.label_canvas is None else {}
+        for size in self.sizes:
+            if size == self.img_size:
+                self.pyramid[size] = self.img
+            else:
+                self.pyramid[size] = cv2.resize(self.canvas, (size, size), interpolation=cv2.INTER_AREA)
+            if self.label_pyramid is None:
+                continue
+            if size == self.img_size:
+                self.label_pyramid[size] = {'label_map': self.label_map, 'semantic_mask': self.semantic_mask}
+            else:
+                self.label_pyramid[size] = {
+                    name: cv2.resize(canvas, (size, size), interpolation=cv2.INTER_NEAREST_EXACT)
+                    for name, canvas in (('label_map', self.label_canvas), ('semantic_mask', self.semantic_canvas))}
+        
+    def to_dtype(self, color):
+        """
+        Converts color from [0,1] to image type, see Colorer.to_dtype
+        """
+        return tuple(self.colorer.to_dtype(color).tolist())
+        
+    def rotation_matrix(self, angles):
+        """
+        Rotation matrices for angles in degrees, shape (angles count, 2, 2)
+        """
+        rad = np.deg2rad(np.atleast_1d(angles))
+        cos, sin = np.cos(rad), np.sin(rad)
+        return np.stack([np.stack([cos, sin], axis=-1),
+                         np.stack([-sin, cos], axis=-1)], axis=-2)
         
     def rotate(self ,point,f):
-        b = [[np.cos(np.deg2rad(f)),np.sin(np.deg2rad(f))],
-         [-np.sin(np.deg2rad(f)), np.cos(np.deg2rad(f))]]
-        res = [a for a in np.dot(point,b)]
+        res = np.dot(point, self.rotation_matrix(f)[0])
         return [int(np.round(a,5)) for a in res]
     
+    def place_points(self, points, center_dist, angles, shift):
+        """
+        Moves points to center, rotates them by every angle and shifts them
+
+        Parameters
+        ---------
+        points: numpy.array, required
+            Points with shape (N, 2)
+            
+        center_dist: int, required
+            Distance to move points to center
+            
+        angles: list or int, required
+            Angles in degrees to rotate points by
+            
+        shift: int, required
+            Shift of rotated points
+            
+        Returns
+        ----------
+        numpy.array:
+            placed points with shape (angles count, N, 2)
+        """
+        points = np.asarray(points).reshape(-1, 2) - center_dist
+        placed = np.trunc(np.round(points @ self.rotation_matrix(angles), 5)).astype(int)
+        return placed + shift
+    
     def prepare_points(self, contour, points_in_contour, center_dist, angle, shift):
-        cntr = [[a[0] -center_dist, a[1]-center_dist] for a in contour]
-        cntr = [self.rotate(a,angle) for a in cntr]
-        cntr = [[a[0] + shift, a[1]+shift] for a in cntr]
+        cntr = self.place_points(contour, center_dist, angle, shift)[0]
+        lengths = [len(row) for row in points_in_contour]
+        points_in = self.place_points(np.concatenate(points_in_contour) if lengths else [],
+                                      center_dist, angle, shift)[0]
+        return cntr, np.split(points_in, np.cumsum(lengths)[:-1]) if lengths else []
+            
+    def get_petal(self, lvl_size, petal_num, uz, scale, scale_x):
+        """
+        Draws petal and finds points inside it in filling order, uses cache if it is set
 
-        points_in = [[[a[0] -center_dist, a[1]-center_dist] for a in row] for row in points_in_contour]
-        points_in = [[self.rotate(a,angle) for a in row] for row in points_in]
-        points_in = [[[a[0] +shift, a[1]+shift] for a in row] for row in points_in]
-        return np.array(cntr), points_in
+        Parameters
+        ---------
+        lvl_size: int, required
+            The image size, where petal should be drawn
+            
+        petal_num: int, required
+            Petal kind
+            
+        uz: bool, required
+            Make petal more narrow or more wide
+            
+        scale: int, required
+            Petal scale
             
-    def draw_level(self,level_size, petal_cnt, petal_num,center_dist = 0,grad_colors=None,scale=100,scale_x=0):
+        scale_x: float, required
+            How match to make petal narrow or wide
+            
+        Returns
+        ----------
+        tuple:
+            petal contour and list of points inside contour
+        """
+        img_size_new = int(np.round((lvl_size/scale)*120))
+        center = None
+        if self.colorer.fill_type == 'center':
+            center = self.colorer.get_center(img_size_new)*self.supersample
+        # random values are the same for any supersample, sizes are scaled
+        if self.supersample > 1:
+            lvl_size = lvl_size*self.supersample
+            img_size_new = int(np.round((lvl_size/scale)*120))
+        if self.cache is not None:
+            key = self.cache.make_key(petal_num, self.petal.get_version(petal_num),
+                                      lvl_size, scale, scale_x, uz,
+                                      self.colorer.fill_type, self.colorer.engine, center)
+            value = self.cache.get(key)
+            if value is not None:
+                return value
+        with self.profiler.stage('petal'):
+            contour = self.petal.draw(lvl_size, petal_num, True, uz, scale, scale_x)
+        with self.profiler.stage('points') as record:
+            points_in_contour = self.colorer.get_points(contour, img_size_new, center)
+            record['pixels'] = sum(len(row) for row in points_in_contour)
+        if self.cache is not None:
+            self.cache.put(key, contour, points_in_contour)
+        return contour, points_in_contour
+    
+    def draw_level(self,level_size, petal_cnt, petal_num,center_dist = 0,grad_colors=None,scale=100,scale_x=0,
+                   level_num=0):
         grad_color_from, grad_color_to, border_color = self.__parse_grad_colors(grad_colors)
         
         # the div numbers is based on logic - center and proportion of petals to image
-        img_size_div_2 = int(np.round(self.img_size/2))
+        img_size_div_2 = int(np.round(self.render_size/2))
         lvl_size_div_3 = int(np.round(level_size/3))
+        center_dist = center_dist*self.supersample
         
         # probability to make petal more narrow or wide
-        uz  = np.random.randint(0,10) > 5
-        contour = self.petal.draw(lvl_size_div_3, petal_num, True, uz, scale, scale_x)
-        img_size_new = int(np.round((lvl_size_div_3/scale)*120))
-        
-        points_in_contour = self.colorer.get_points(contour, img_size_new)
+        uz  = randint(self.rng, 0,10) > 5
+        contour, points_in_contour = self.get_petal(lvl_size_div_3, petal_num, uz, scale, scale_x)
+        if self.geometry is not None:
+            level = self.add_geometry_level(points_in_contour)
         
         # find angle to rotate every petal by petal
         angle = int(np.round(360/petal_cnt))
-        pred_angle = np.random.randint(self.SHIFT_DEGREE)
+        pred_angle = randint(self.rng, 0, self.SHIFT_DEGREE)
+        angles = pred_angle + angle*np.arange(petal_cnt)
+        
+        # place all petals at once
+        with self.profiler.stage('place') as record:
+            cntrs = self.place_points(contour, center_dist, angles, img_size_div_2)
+            lengths = [len(row) for row in points_in_contour]
+            points_in = self.place_points(np.concatenate(points_in_contour) if lengths else [],
+                                          center_dist, angles, img_size_div_2)
+            splits = np.cumsum(lengths)[:-1]
+            record['pixels'] = points_in.size//2
+            
+        img = self.canvas
+        index = self.geometry['index'] if self.geometry is not None else None
+        if self.geometry is not None:
+            level['cntrs'] = cntrs
+        if self.layered:
+            # draw level on its own layer, which covers only the level petals
+            box = self.get_box(cntrs)
+            img = self.canvas[box[1]:box[3], box[0]:box[2]].copy()
+            if index is not None:
+                index = index[box[1]:box[3], box[0]:box[2]].copy()
+            cntrs, points_in = cntrs - box[:2], points_in - box[:2]
 
         for i in range(petal_cnt):
-            cntr, points_in = self.prepare_points(contour,
-                                                  points_in_contour,
-                                                  center_dist,
-                                                  pred_angle,
-                                                  img_size_div_2)
+            cntr = cntrs[i]
+            with self.profiler.stage('fill_poly', petal=i):
+                cv2.fillPoly(img, pts =[cntr], color=self.fill_color)
+                cv2.drawContours(img, [cntr], -1, color = border_color,thickness=self.supersample)
+                if index is not None:
+                    cv2.fillPoly(index, pts=[cntr], color=self.FILL_INDEX)
+                    cv2.drawContours(index, [cntr], -1, color=level['border'], thickness=self.supersample)
+            with self.profiler.stage('fill', petal=i) as record:
+                self.colorer.fill(img, cntr, np.split(points_in[i], splits) if lengths else [],
+                                  grad_color_from, grad_color_to, self.fill_color,
+                                  index=index, offset=level['offset'] if index is not None else 0)
+                record['pixels'] = len(points_in[i])
+            if self.instances is not None:
+                with self.profiler.stage('labels', petal=i):
+                    self.add_label(cntr + box[:2] if self.layered else cntr, level_num, i)
+                
+        if self.layered:
+            with self.profiler.stage('composite'):
+                alpha = self.add_layer(img, cntrs, box)
+                if index is not None:
+                    self.geometry['index'][box[1]:box[3], box[0]:box[2]][alpha] = index[alpha]
+                
+    def init_geometry(self):
+        """
+        Makes empty geometry record with flower center
+        """
+        index = np.full((self.render_size, self.render_size), self.BACKGROUND_INDEX, np.int32)
+        center_coordinate = int(np.round(self.render_size/2))
+        cv2.circle(index, (center_coordinate,center_coordinate), 
+                   self.center_size*self.supersample, self.CENTER_INDEX, -1)
+        self.geometry = {'index': index, 'levels': [], 'palette_size': self.FILL_INDEX + 1}
+        
+    def add_geometry_level(self, points_in_contour):
+        """
+        Adds level to geometry record, palette of level is border color and gradient colors,
+        see Colorer.palette_counts
+        """
+        counts = self.colorer.palette_counts(points_in_contour)
+        border = self.geometry['palette_size']
+        level = {'counts': counts, 'border': border, 'offset': border + 1}
+        self.geometry['palette_size'] += 1 + (self.colorer.LUT_SIZE if counts is None else int(counts.sum()))
+        self.geometry['levels'].append(level)
+        return level
+    
+    def recolor(self, grad_colors='hot'):
+        """
+        Draws the same flower with other colors from geometry record, see draw(record=True).
+        The flower is drawn with one lookup of colors, layers aren't changed.
+        Pixels are the same as drawing with these colors, except a few pixels of 'center' filling,
+        where red channel of gradient colors is the same as of fill color
+
+        Parameters
+        ---------
+        grad_colors: str or list or None
+            Colormap name, gradient colors (from, to and border color) or None for random colors, 
+            see draw, default='hot'
+        """
+        if self.geometry is None:
+            raise ValueError('flower should be drawn with record=True to be recolored')
+        self.colors = []
+        for level in self.geometry['levels']:
+            self.__parse_grad_colors(grad_colors)
+        np.take(self.get_palette(self.colors), self.geometry['index'], axis=0, out=self.canvas)
+        self.update_img()
+
+    def get_palette(self, colors, levels=None):
+        """
+        Palette of geometry record for gradient colors (from, to and border color) of every level,
+        levels are levels of geometry record, default=None (levels of drawn flower), see geometry attribute
+        """
+        if levels is None:
+            levels = self.geometry['levels']
+        palette = [np.array([self.colorer.to_dtype((1, 1, 1)), self.center_color, self.fill_color],
+                            dtype=self.dtype)]
+        for level, (grad_color_from, grad_color_to, border_color) in zip(levels, colors):
+            palette.append(np.array([self.to_dtype([a/self.BORDER_DARKNESS for a in border_color])],
+                                    dtype=self.dtype))
+            palette.append(self.colorer.get_palette(level['counts'], grad_color_from, grad_color_to))
+        return np.concatenate(palette)
+    
+    def init_labels(self):
+        """
+        Makes empty label map and semantic mask with flower center
+        """
+        size = (self.render_size, self.render_size)
+        self.label_canvas = np.zeros(size, np.uint16)
+        self.semantic_canvas = np.zeros(size, np.uint8)
+        self.instances = []
+        center_coordinate = int(np.round(self.render_size/2))
+        cv2.circle(self.semantic_canvas, (center_coordinate,center_coordinate), 
+                   self.center_size*self.supersample, self.CENTER, -1)
+        
+    def add_label(self, cntr, level, petal):
+        """
+        Draws petal on label map and semantic mask and adds it to instances
+
+        Parameters
+        ---------
+        cntr: numpy.array, required
+            Petal contour on canvas
+            
+        level: int, required
+            Level number
+            
+        petal: int, required
+            Petal number on level
+        """
+        instance_id = len(self.instances) + 1
+        cv2.fillPoly(self.label_canvas, pts=[cntr], color=instance_id)
+        cv2.drawContours(self.label_canvas, [cntr], -1, color=instance_id, thickness=self.supersample)
+        cv2.fillPoly(self.semantic_canvas, pts=[cntr], color=self.PETAL)
+        cv2.drawContours(self.semantic_canvas, [cntr], -1, color=self.PETAL, thickness=self.supersample)
+        polygon = np.round(cntr/self.supersample).astype(np.int32)
+        start = np.clip(polygon.min(axis=0), 0, self.img_size)
+        end = np.clip(polygon.max(axis=0) + 1, 0, self.img_size)
+        self.instances.append({'id': instance_id,
+                               'level': level,
+                               'petal': petal,
+                               'box': tuple(int(b) for b in np.concatenate([start, end])),
+                               'polygon': polygon})
+    
+    def get_labels(self):
+        """
+        Labels of drawn flower for segmentation and detection, see label_map, semantic_mask and instances
+        
+        Returns
+        ----------
+        dict:
+            label_map, semantic_mask and instances
+        """
+        return {'label_map': self.label_map,
+                'semantic_mask': self.semantic_mask,
+                'instances': self.instances}
+                
+    def get_box(self, cntrs):
+        """
+        Bounding box of petal contours with one pixel border for gradient filling,
+        (first column, first row, last column + 1, last row + 1)
+        """
+        start = np.maximum(cntrs.min(axis=(0, 1)) - 1, 0)
+        end = np.minimum(cntrs.max(axis=(0, 1)) + 2, self.render_size)
+        return np.concatenate([start, np.maximum(end, start)])
+    
+    def add_layer(self, layer, cntrs, box):
+        """
+        Adds level layer to layers and draws it on image, 
+        alpha of layer is set for petals and for all changed pixels, alpha mask is returned
 
-            pred_angle = pred_angle + angle
-            cv2.fillPoly(self.img, pts =[cntr], color=self.fill_color)
-            cv2.drawContours(self.img, [cntr], -1, color = border_color,thickness=1)
-            self.colorer.fill(self.img, cntr, points_in, grad_color_from, grad_color_to, self.fill_color)
+        Parameters
+        ---------
+        layer: numpy.array, required
+            RGB image of level in box
+            
+        cntrs: numpy.array, required
+            Petal contours in box coordinates
+            
+        box: numpy.array, required
+            Box of layer on image, see get_box
+        """
+        img = self.canvas[box[1]:box[3], box[0]:box[2]]
+        alpha = np.zeros(layer.shape[:2], np.uint8)
+        cv2.fillPoly(alpha, pts=list(cntrs), color=1)
+        cv2.drawContours(alpha, list(cntrs), -1, color=1, thickness=1)
+        alpha = (alpha > 0) | np.any(layer != img, axis=2)
+        img[alpha] = layer[alpha]
+        self.layers.append({'box': tuple(int(b) for b in box),
+                            'rgba': np.dstack([layer, alpha*self.colorer.to_dtype(1)])})
+        return alpha
     
-    def draw(self, grad_colors='hot'):
+    def draw(self, grad_colors='hot', labels=False, record=False, sizes=None):
+        """
+        Draws all levels of flower
+
+        Parameters
+        ---------
+        grad_colors: str or list or None
+            Colormap name (see Colorer.color_dict), gradient colors (from, to and border color)
+            or None for random colors, default='hot'
+            
+        labels: bool
+            Draw label map, semantic mask and petal instances in the same pass, default=False
+            
+        record: bool
+            Keep geometry record to draw the flower with other colors, see recolor, default=False
+            
+        sizes: list
+            Image sizes of pyramid, from 1 to img_size. Flower is drawn once, images of all sizes
+            are downsampled from canvas with area interpolation (label maps with the nearest labels)
+            to pyramid and label_pyramid attributes, default=None (no pyramid)
+        """
+        if sizes is not None and (not len(sizes) or not all(1 <= size <= self.img_size for size in sizes)):
+            raise ValueError('pyramid sizes should be from 1 to img_size %d, not %s' % (self.img_size, sizes))
+        self.sizes = None if sizes is None else sorted(set(int(size) for size in sizes), reverse=True)
+        if self.sizes is None:
+            self.pyramid = self.label_pyramid = None
+        self.layers, self.colors = [], []
+        if labels:
+            self.init_labels()
+        else:
+            self.label_canvas = self.semantic_canvas = self.instances = None
+        if record:
+            self.init_geometry()
+        else:
+            self.geometry = None
         level_size = self.img_size
+        center_dists, level_shrinks = [], []
         for i in range(self.levels_cnt):
-            self.draw_level(level_size,
-                            self.petal_cnt[i],
-                            self.petal_kinds[i],
-                            grad_colors=grad_colors,
-                            center_dist=np.random.randint(0,20)-10,
-                            scale=self.scale[i],
-                            scale_x=self.scale_x[i])
-            level_size = int(np.round(level_size*(np.random.randint(5,8)/10)))
+            # random values are generated between levels to keep the order of random generator
+            if isinstance(self.center_dist, str):
+                center_dists.append(randint(self.rng, self.CENTER_DIST_MIN, self.CENTER_DIST_MAX))
+            else:
+                center_dists.append(self.center_dist[i])
+            with self.profiler.stage('level', level=i):
+                self.draw_level(level_size,
+                                self.petal_cnt[i],
+                                self.petal_kinds[i],
+                                grad_colors=grad_colors,
+                                center_dist=center_dists[i],
+                                scale=self.scale[i],
+                                scale_x=self.scale_x[i],
+                                level_num=i)
+            if isinstance(self.level_shrink, str):
+                level_shrinks.append(randint(self.rng, self.SHRINK_MIN, self.SHRINK_MAX)/10)
+            else:
+                level_shrinks.append(self.level_shrink[i])
+            level_size = int(np.round(level_size*level_shrinks[i]))
+        self.drawn_center_dist, self.drawn_level_shrink = center_dists, level_shrinks
+        self.update_img()
+            
+    def get_params(self):
+        """
+        Parameters of drawn flower
+
+        Returns
+        ----------
+        dict:
+            image size, levels count, filling type, petal count, kinds, scales, shifts to center,
+            level shrinks and gradient colors (from, to and border color) for each level
+        """
+        def to_list(values):
+            if isinstance(values, str):
+                return values
+            return [v.item() if isinstance(v, np.generic) else v for v in values]
+        # configured values if flower isn't drawn yet
+        center_dist = self.center_dist if self.drawn_center_dist is None else self.drawn_center_dist
+        level_shrink = self.level_shrink if self.drawn_level_shrink is None else self.drawn_level_shrink
+        return {'img_size': self.img_size,
+                'levels_cnt': self.levels_cnt,
+                'fill_type': self.colorer.fill_type,
+                'petal_cnt': to_list(self.petal_cnt),
+                'petal_kinds': to_list(self.petal_kinds),
+                'scale': to_list(self.scale),
+                'scale_x': to_list(self.scale_x),
+                'center_dist': to_list(center_dist),
+                'level_shrink': to_list(level_shrink),
+                'colors': self.colors}
             
     def __parse_grad_colors(self, grad_colors):
         if not grad_colors:
@@ -178,14 +710,16 @@ class Flower():
             [grad_color_from, grad_color_to, border_color] = self.colorer.get_colors(grad_colors)
         else:
             [grad_color_from, grad_color_to, border_color] = grad_colors
+        self.colors.append([[float(a) for a in color] 
+                            for color in (grad_color_from, grad_color_to, border_color)])
             
-        border_color = [a/self.BORDER_DARKNESS for a in border_color]
+        border_color = self.to_dtype([a/self.BORDER_DARKNESS for a in border_color])
         return grad_color_from, grad_color_to, border_color
     
     def __parse_petal_count(self, petal_cnt):
         if petal_cnt == 'random':
-            self.petal_cnt = [np.random.randint(self.PETAL_CNT_MIN,
-                                           self.PETAL_CNT_MAX) for i in range(self.levels_cnt)]
+            self.petal_cnt = [randint(self.rng, self.PETAL_CNT_MIN,
+                                      self.PETAL_CNT_MAX) for i in range(self.levels_cnt)]
         elif type(petal_cnt) == int:
             self.petal_cnt = [petal_cnt for i in range(self.levels_cnt)]
         else:
@@ -193,7 +727,8 @@ class Flower():
             
     def __parse_petal_kinds(self, petal_kinds):
         if petal_kinds == 'random':
-            self.petal_kinds = [np.random.randint(1,len(self.petal.kp)+1) for i in range(self.levels_cnt)] 
+            kinds = self.petal.kinds()
+            self.petal_kinds = [kinds[randint(self.rng, 0,len(kinds))] for i in range(self.levels_cnt)]
         elif type(petal_kinds) == int:
             self.petal_kinds = [petal_kinds for i in range(self.levels_cnt)]
         else:
@@ -201,7 +736,7 @@ class Flower():
             
     def __parse_scale(self, scale):
         if scale == 'random':
-            self.scale = [np.random.randint(self.SCALE_LEFT, self.SCALE_RIGHT) for i in range(self.levels_cnt)]
+            self.scale = [randint(self.rng, self.SCALE_LEFT, self.SCALE_RIGHT) for i in range(self.levels_cnt)]
         elif type(scale) == int:
             self.scale = [scale for i in range(self.levels_cnt)]
         else:
@@ -209,8 +744,24 @@ class Flower():
             
     def __parse_scale_x(self, scale_x):
         if scale_x == 'random':
-            self.scale_x = [np.random.randint(0,40)/100 for i in range(self.levels_cnt)]
+            self.scale_x = [randint(self.rng, 0,40)/100 for i in range(self.levels_cnt)]
         elif type(scale_x) == int:
             self.scale_x = [scale_x for i in range(self.levels_cnt)]
         else:
-            self.scale_x = scale_x
\ No newline at end of file
+            self.scale_x = scale_x
+            
+    def __parse_center_dist(self, center_dist):
+        if center_dist == 'random':
+            self.center_dist = center_dist
+        elif type(center_dist) == int:
+            self.center_dist = [center_dist for i in range(self.levels_cnt)]
+        else:
+            self.center_dist = center_dist
+            
+    def __parse_level_shrink(self, level_shrink):
+        if level_shrink == 'random':
+            self.level_shrink = level_shrink
+        elif type(level_shrink) in (int, float):
+            self.level_shrink = [level_shrink for i in range(self.levels_cnt)]
+        else:
+            self.level_shrink = level_shrink
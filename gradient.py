@@ -0,0 +1,63 @@
+import numpy as np
+import cv2
+
+
+def normalize(values):
+    """
+    Scales values to [0,1]
+    """
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.zeros_like(values)
+    return (values - low)/(high - low)
+
+
+def top_down(coords, mask, center):
+    """
+    Gradient along petal rows, from the first row of petal to the last one
+
+    Parameters
+    ---------
+    coords: numpy.array, required
+        Coordinates of petal pixels in petal frame with shape (N, 2),
+        in order of numpy.nonzero(mask)
+
+    mask: numpy.array, required
+        Bool mask of petal pixels on image, indexed as [row, col]
+
+    center: numpy.array, required
+        Center point of gradient in petal frame
+
+    Returns
+    ----------
+    numpy.array:
+        gradient parameter in [0,1] for every pixel
+    """
+    return normalize(coords[:, 0])
+
+
+def diagonal(coords, mask, center):
+    """
+    Gradient along the main diagonal of petal frame, see top_down
+    """
+    return normalize(coords[:, 0] + coords[:, 1])
+
+
+def center(coords, mask, center):
+    """
+    Gradient from center point to petal border: distance to center divided by
+    sum of distances to center and to the nearest pixel outside petal, see top_down
+    """
+    # one pixel padding, so pixels on the box border are near the outside
+    padded = np.pad(mask, 1).astype(np.uint8)
+    border_dist = cv2.distanceTransform(padded, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)[1:-1, 1:-1][mask]
+    # squared distances are integers, rounding removes float noise, which differs from call to call
+    border_dist = np.sqrt(np.round(border_dist.astype(np.float64)**2))
+    center_dist = np.sqrt(((coords - center)**2).sum(axis=1))
+    return center_dist/(center_dist + border_dist)
+
+
+# gradient styles of analytic engine by filling type, new style is a function with the same arguments
+GRADIENTS = {'top_down': top_down,
+             'diagonal': diagonal,
+             'center': center}
@@ -1,12 +1,15 @@
 import numpy as np
-import cv2
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
 
 class Petal():
     """
     Main petal class. Kepps key points to draw petals, can draw petal and .
 
+    Parameters
+    ---------
+    library: PetalLibrary
+        Library of precomputed petal contours, if petal kind is in library,
+        its contour is used instead of smoothing key points, default=None
+
     Attributes
     ---------
     kp: dict
@@ -61,8 +64,25 @@ class Petal():
          'smooth_available':True},
         {'points':[[64,82],[71,85],[75,86],[84,84]],
          'smooth_available':True}]}
-    def __init__(self):
-        pass
+    def __init__(self, library=None):
+        self.library = library
+        
+    def kinds(self):
+        """
+        List of all petal kinds: kinds from kp and kinds from library
+        """
+        kinds = set(self.kp)
+        if self.library is not None:
+            kinds.update(self.library.kinds)
+        return sorted(kinds)
+    
+    def get_version(self, kind):
+        """
+        Source of petal contour: None for key points from kp, hash of contour for library
+        """
+        if self.library is not None and kind in self.library:
+            return self.library.digest(kind)
+        return None
         
     def draw(self,img_size=100, kind=1, smooth=True, uz=True, scale=100, scale_x=0):
         """
@@ -98,6 +118,27 @@ class Petal():
             contour of petal to draw
         """
         
+        if self.library is not None and kind in self.library:
+            contour = self.library.resample(kind, img_size/scale)
+        else:
+            contour = np.array(self.smooth_kp(img_size, kind, smooth, scale)).reshape(-1, 2)
+                
+        # make petal contour more narrow or more wide
+        narrow = 1-(np.abs(contour[:,0]-contour[:,1])/img_size)*scale_x
+        if uz:
+            contour = np.round(contour * narrow[:,None]).astype(int)
+        else:
+            contour = np.round(contour / narrow[:,None]).astype(int)
+            
+        # make full contour, mirror part about the main diagonal
+        contour = np.concatenate([contour, contour[::-1,::-1]])
+        return contour
+    
+    def smooth_kp(self, img_size, kind, smooth, scale):
+        """
+        Scales key points of petal and smoothes them with cubic interpolation
+        """
+        from scipy.interpolate import interp1d
         # get the key points
         kp = self.kp[kind]
         contour = []
@@ -116,21 +157,4 @@ class Petal():
                     contour = contour + d
             else:
                 contour = [a for a in d['points'] for d in kp ]
-                
-        # make petal contour more narrow or more wide
-        if uz:
-            contour = [[int(np.round(v[0] * (1-(np.abs(v[0]-v[1])/img_size)*scale_x))),
-                        int(np.round(v[1] * (1-(np.abs(v[0]-v[1])/img_size)*scale_x)))] for v in contour]
-        else:
-            contour = [[int(np.round(v[0] / (1-(np.abs(v[0]-v[1])/img_size)*scale_x))),
-                        int(np.round(v[1] / (1-(np.abs(v[0]-v[1])/img_size)*scale_x)))] for v in contour]
-            
-        # make full contour, mirror part about the main diagonal
-        contour = contour + [[p[1],p[0]] for p in reversed(contour)]
-        
-# #         this part is for testing
-#         img = np.ones((img_size,img_size,3))
-#         cv2.fillPoly(img, pts =[np.array(contour)], color=(255,0,255))
-#         plt.figure(figsize=(8, 8))
-#         plt.imshow(img)
-        return np.array(contour)
\ No newline at end of file
+        return contour
\ No newline at end of file
@@ -0,0 +1,158 @@
+import argparse
+import hashlib
+import numpy as np
+
+
+class PetalLibrary():
+    """
+    Library of precomputed petal contours. Keeps smoothed contour of every petal kind
+    in [0,100] border of rows and columns, all contours are packed in one array.
+
+    Parameters
+    ---------
+    points: numpy.array
+        Points of all contours with shape (N, 2), default=None (empty library)
+
+    offsets: numpy.array
+        Start of every contour in points and end of the last one, default=None
+
+    kinds: numpy.array
+        Petal kind for every contour, default=None
+
+    Attributes
+    ---------
+    RESOLUTION: int
+        Count of contour points per one unit of row, when smoothed segments are computed
+    """
+    RESOLUTION = 10
+
+    def __init__(self, points=None, offsets=None, kinds=None):
+        self.points = np.zeros((0, 2)) if points is None else np.asarray(points, dtype=np.float64)
+        self.offsets = np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets)
+        self.kinds = [] if kinds is None else [int(k) for k in kinds]
+        self.index = {kind: i for i, kind in enumerate(self.kinds)}
+
+    def __contains__(self, kind):
+        return kind in self.index
+
+    @classmethod
+    def build(cls, kp=None, resolution=None):
+        """
+        Computes smoothed contours of petals with cubic interpolation
+
+        Parameters
+        ---------
+        kp: dict
+            Key points of petals in format of Petal.kp, default=None (Petal.kp)
+
+        resolution: int
+            Count of contour points per one unit of row, default=None (RESOLUTION)
+
+        Returns
+        ----------
+        PetalLibrary:
+            library with all petal kinds
+        """
+        from scipy.interpolate import interp1d
+        if kp is None:
+            from petal import Petal
+            kp = Petal.kp
+        resolution = resolution or cls.RESOLUTION
+        library = cls()
+        for kind, segments in kp.items():
+            contour = []
+            for elem in segments:
+                d = np.array(elem['points'], dtype=np.float64)
+                if elem['smooth_available'] and len(np.unique(d[:, 0])) == len(d):
+                    smooth_fun = interp1d(d[:, 0], d[:, 1], kind='cubic')
+                    interp_x = np.linspace(d[0, 0], d[-1, 0],
+                                           int(np.ceil(abs(d[-1, 0] - d[0, 0])*resolution)) + 1)
+                    d = np.stack([interp_x, smooth_fun(interp_x)], axis=1)
+                contour.append(d)
+            library.register(kind, np.concatenate(contour))
+        return library
+
+    def register(self, kind, contour):
+        """
+        Adds petal kind to library, replaces contour if kind is already in library
+
+        Parameters
+        ---------
+        kind: int, required
+            Petal kind
+
+        contour: numpy.array, required
+            Half of petal contour with shape (N, 2) in [0,100] border of rows and columns,
+            from petal base to the main diagonal. The other half is mirrored about the main diagonal
+        """
+        contour = np.asarray(contour, dtype=np.float64).reshape(-1, 2)
+        contours = [self.get(k) for k in self.kinds if k != kind] + [contour]
+        kinds = [k for k in self.kinds if k != kind] + [int(kind)]
+        lengths = [len(c) for c in contours]
+        self.points = np.concatenate(contours)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.kinds = kinds
+        self.index = {k: i for i, k in enumerate(kinds)}
+
+    def get(self, kind):
+        """
+        Half of petal contour in [0,100] border of rows and columns
+        """
+        i = self.index[kind]
+        return self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    def digest(self, kind):
+        """
+        Hash of petal contour, changes if contour of kind is replaced
+        """
+        return hashlib.sha1(np.ascontiguousarray(self.get(kind)).tobytes()).hexdigest()
+
+    def resample(self, kind, factor):
+        """
+        Scales half of petal contour to image pixels
+
+        Parameters
+        ---------
+        kind: int, required
+            Petal kind
+
+        factor: float, required
+            Scale of contour, image size divided by petal scale
+
+        Returns
+        ----------
+        numpy.array:
+            contour points with shape (N, 2), the same consecutive points are removed
+        """
+        contour = np.round(self.get(kind)*factor).astype(int)
+        keep = np.r_[True, np.any(np.diff(contour, axis=0) != 0, axis=1)]
+        return contour[keep]
+
+    def save(self, path):
+        """
+        Saves library to .npz file
+        """
+        np.savez(path, points=self.points, offsets=self.offsets, kinds=np.array(self.kinds))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads library from .npz file
+        """
+        with np.load(path) as data:
+            return cls(data['points'], data['offsets'], data['kinds'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build library of precomputed petal contours')
+    parser.add_argument('path', help='path to .npz file')
+    parser.add_argument('--resolution', type=int, default=PetalLibrary.RESOLUTION,
+                        help='count of contour points per one unit of row')
+    args = parser.parse_args()
+    library = PetalLibrary.build(resolution=args.resolution)
+    library.save(args.path)
+    print('%d petal kinds, %d points' % (len(library.kinds), len(library.points)))
+
+
+if __name__ == '__main__':
+    main()
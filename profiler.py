@@ -0,0 +1,112 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class Profiler():
+    """
+    Collects wall time and pixel counts of flower drawing stages:
+    'level', 'petal' (Petal.draw), 'points' (Colorer.get_points), 'place' (rotation of petals),
+    'fill_poly' (cv2.fillPoly and cv2.drawContours), 'fill' (gradient filling),
+    'composite' (putting level layer on image in layered mode), 'labels' (drawing label maps)
+    and 'pyramid' (downsampling images of pyramid sizes).
+    Values are summed by stage and level, so profiler can be used for many flowers.
+
+    Parameters
+    ---------
+    keep_records: bool
+        Keep every measured stage with level and petal number, default=False
+
+    Attributes
+    ---------
+    totals: dict
+        (stage, level) to [calls count, seconds, pixels]
+
+    records: list
+        Measured stages as dicts, if keep_records is True
+    """
+    def __init__(self, keep_records=False):
+        self.keep_records = keep_records
+        self.totals = {}
+        self.records = []
+        self.level = None
+
+    @contextmanager
+    def stage(self, name, level=None, petal=None):
+        """
+        Measures stage, level is inherited from outer 'level' stage.
+        Pixel count can be set to 'pixels' of yielded dict
+        """
+        if level is None:
+            level = self.level
+        outer_level, self.level = self.level, level
+        record = {'stage': name, 'level': level, 'petal': petal, 'pixels': 0}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self.level = outer_level
+            self.add(name, level, 1, record['seconds'], record['pixels'])
+            if self.keep_records:
+                self.records.append(record)
+
+    def add(self, name, level, calls, seconds, pixels):
+        total = self.totals.setdefault((name, level), [0, 0.0, 0])
+        total[0] += calls
+        total[1] += seconds
+        total[2] += pixels
+
+    def merge(self, summary):
+        """
+        Adds summary of other profiler, from worker process for example
+        """
+        for item in summary:
+            self.add(item['stage'], item['level'], item['calls'], item['seconds'], item['pixels'])
+
+    def summary(self):
+        """
+        Sums of stages
+
+        Returns
+        ----------
+        list:
+            dicts with stage, level, calls count, seconds and pixels
+        """
+        return [{'stage': name, 'level': level, 'calls': calls, 'seconds': seconds, 'pixels': pixels}
+                for (name, level), (calls, seconds, pixels) in sorted(self.totals.items(), key=str)]
+
+    def to_json(self):
+        return json.dumps({'summary': self.summary(), 'records': self.records})
+
+    def to_prometheus(self, prefix='flower'):
+        """
+        Sums of stages in Prometheus text format
+        """
+        lines = []
+        for metric, key in (('stage_calls_total', 'calls'),
+                            ('stage_seconds_total', 'seconds'),
+                            ('stage_pixels_total', 'pixels')):
+            lines.append('# TYPE %s_%s counter' % (prefix, metric))
+            for item in self.summary():
+                labels = 'stage="%s"' % item['stage']
+                if item['level'] is not None:
+                    labels += ',level="%d"' % item['level']
+                lines.append('%s_%s{%s} %s' % (prefix, metric, labels, item[key]))
+        return '\n'.join(lines) + '\n'
+
+
+class NullProfiler():
+    """
+    Profiler, which measures nothing
+    """
+    record = {}
+
+    def stage(self, name, level=None, petal=None):
+        return self
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, *args):
+        return False
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def make_rng(rng=None):
+    """
+    Makes random generator to draw flowers
+
+    Parameters
+    ---------
+    rng: None or int or numpy.random.SeedSequence or numpy.random.Generator
+        None means global numpy random state (np.random.seed works as before),
+        int or SeedSequence is a seed for new generator, default=None
+
+    Returns
+    ----------
+    numpy.random.Generator or module:
+        random generator
+    """
+    if rng is None or rng is np.random:
+        return np.random
+    if isinstance(rng, (np.random.Generator, np.random.RandomState)):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def randint(rng, low, high):
+    """
+    Random integer from low (inclusive) to high (exclusive)
+    """
+    if isinstance(rng, np.random.Generator):
+        return int(rng.integers(low, high))
+    return rng.randint(low, high)
+
+
+def rand(rng):
+    """
+    Random float from [0, 1)
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng.random()
+    return rng.rand()
+
+
+def get_state(rng):
+    """
+    State of random generator, see set_state
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng.bit_generator.state
+    return rng.get_state()
+
+
+def set_state(rng, state):
+    """
+    Restores state of random generator, so the same random values are generated again
+    """
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state
+    else:
+        rng.set_state(state)
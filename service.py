@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qsl
+import numpy as np
+import cv2
+import batch
+from colorer import Colorer
+from writer import to_uint8
+
+# petal library of worker process
+worker_library = None
+
+# request arguments, which are passed to Flower, and their types
+FLOWER_ARGS = {'img_size': int,
+               'center_size': int,
+               'levels_cnt': int,
+               'fill_type': str,
+               'dtype': str,
+               'engine': str,
+               'supersample': int,
+               'grad_colors': str}
+
+# allowed values of request arguments
+ARG_CHOICES = {'fill_type': ('top_down', 'diagonal', 'center'),
+               'dtype': ('uint8', 'float32', 'float64'),
+               'engine': ('points', 'analytic')}
+
+# ranges of integer request arguments, (min, max) inclusive
+ARG_RANGES = {'seed': (0, 2**32 - 1),
+              'img_size': (1, 4096),
+              'center_size': (0, 4096),
+              'levels_cnt': (1, 16),
+              'supersample': (1, 8)}
+
+# max side of canvas (img_size*supersample) and max bytes of canvas of one request,
+# larger flowers would take memory of all workers
+MAX_RENDER_SIZE = 4096
+MAX_CANVAS_BYTES = 2**28
+
+
+def init_worker(cache_dir=None, library_path=None):
+    """
+    Prepares worker process: geometry cache and petal library
+    """
+    global worker_library
+    batch.init_worker(cache_dir)
+    if library_path:
+        from petal_library import PetalLibrary
+        worker_library = PetalLibrary.load(library_path)
+
+
+def render_tasks(tasks):
+    """
+    Renders and encodes batch of flowers in worker process
+
+    Parameters
+    ---------
+    tasks: list, required
+        (seed, params, out_format) for every flower, out_format is 'png' or 'raw'
+
+    Returns
+    ----------
+    list:
+        (error or None, encoded image, shape, dtype) for every flower,
+        error of one flower doesn't affect other flowers of batch
+    """
+    results = []
+    for seed, params, out_format in tasks:
+        if worker_library is not None:
+            params = dict(params, petal_library=worker_library)
+        try:
+            _, img = batch.render_flower(seed, params)
+        except IndexError:
+            results.append(('petal is out of image', b'', None, None))
+            continue
+        except Exception as e:
+            results.append((repr(e), b'', None, None))
+            continue
+        if out_format == 'png':
+            _, buf = cv2.imencode('.png', cv2.cvtColor(to_uint8(img), cv2.COLOR_RGB2BGR))
+            results.append((None, buf.tobytes(), img.shape, 'uint8'))
+        else:
+            results.append((None, np.ascontiguousarray(img).tobytes(), img.shape, str(img.dtype)))
+    return results
+
+
+def warm_up():
+    """
+    Renders small flower to import modules and fill caches of worker
+    """
+    return render_tasks([(0, {'img_size': 100, 'center_size': 10}, 'raw')])
+
+
+class FlowerService():
+    """
+    Local service, which draws flowers on demand in warm worker processes.
+    Requests wait in bounded queue, new requests are rejected when queue is full,
+    small concurrent requests are sent to workers in batches. Workers are started again
+    if one of them is killed (out of memory for example), only requests of its batch fail.
+
+    HTTP endpoints:
+    GET /flower?seed=1&img_size=256&format=png - flower image, format is 'png' or 'raw'
+    (raw bytes with X-Shape and X-Dtype headers), other arguments are FLOWER_ARGS
+    (checked with ARG_CHOICES, ARG_RANGES, MAX_RENDER_SIZE and MAX_CANVAS_BYTES,
+    bad requests are rejected before queue),
+    GET /metrics - metrics in Prometheus text format, GET /health - 'ok'
+
+    Parameters
+    ---------
+    workers: int
+        Count of worker processes, default=None (count of processors)
+
+    max_queue: int
+        Max count of requests waiting for workers, default=64
+
+    max_batch: int
+        Max count of requests sent to worker at once, default=8
+
+    batch_wait: float
+        Seconds to wait for more requests to batch them, default=0.002
+
+    cache_dir: str
+        Directory of petal geometry cache shared by workers, default=None (memory only)
+
+    library_path: str
+        Path to petal library loaded by workers, see PetalLibrary, default=None
+
+    latency_window: int
+        Count of the last requests to compute latency quantiles, default=1000
+    """
+    def __init__(self, workers=None, max_queue=64, max_batch=8, batch_wait=0.002, cache_dir=None,
+                 library_path=None, latency_window=1000):
+        self.workers = workers or os.cpu_count()
+        self.cache_dir = cache_dir
+        self.library_path = library_path
+        self.executor = self.make_executor()
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.queue = asyncio.Queue(max_queue)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.busy = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.counters = {'requests': 0, 'rejected': 0, 'errors': 0, 'batches': 0, 'batched_requests': 0,
+                         'queue_seconds': 0.0, 'restarts': 0}
+        self.latency_sum = 0.0
+        self.dispatcher = None
+
+    def make_executor(self):
+        return ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                   initargs=(self.cache_dir, self.library_path))
+
+    async def warm_up(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.executor, warm_up) for i in range(self.workers)])
+
+    async def start(self):
+        """
+        Starts workers and dispatcher of requests
+        """
+        await self.warm_up()
+        self.dispatcher = asyncio.ensure_future(self.dispatch())
+
+    async def restart(self, broken):
+        """
+        Replaces broken executor (a worker was killed, by out of memory for example) with new warm workers,
+        executor is replaced once for all batches, which were sent to broken one
+        """
+        if self.executor is not broken:
+            return
+        self.counters['restarts'] += 1
+        self.executor = self.make_executor()
+        broken.shutdown(wait=False)
+        try:
+            await self.warm_up()
+        except BrokenProcessPool:
+            # the next batch on these workers restarts them again
+            pass
+
+    async def close(self):
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+        self.executor.shutdown()
+
+    async def render(self, seed=None, params=None, out_format='png'):
+        """
+        Draws flower
+
+        Parameters
+        ---------
+        seed: int
+            Seed of flower, default=None (random)
+
+        params: dict
+            Flower parameters, see batch.render_flower, default=None
+
+        out_format: str
+            'png' or 'raw', default='png'
+
+        Returns
+        ----------
+        tuple:
+            encoded image, image shape and dtype
+
+        Raises
+        ----------
+        asyncio.QueueFull:
+            if queue is full
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait(((seed, params or {}, out_format), future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.counters['rejected'] += 1
+            raise
+        self.counters['requests'] += 1
+        return await future
+
+    async def dispatch(self):
+        """
+        Takes requests from queue and sends them to workers in batches
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            requests = [await self.queue.get()]
+            # wait a bit for concurrent requests
+            deadline = loop.time() + self.batch_wait
+            while len(requests) < self.max_batch:
+                if not self.queue.empty():
+                    requests.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    requests.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.busy += 1
+            asyncio.ensure_future(self.run_batch(requests))
+
+    async def run_batch(self, requests):
+        start = time.perf_counter()
+        executor = self.executor
+        broken = False
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                executor, render_tasks, [task for task, _, _ in requests])
+        except BrokenProcessPool:
+            # requests of batch on broken executor fail, the next batches go to new workers
+            broken = True
+            results = [('worker process is terminated', b'', None, None)]*len(requests)
+        except Exception as e:
+            results = [(repr(e), b'', None, None)]*len(requests)
+        self.counters['batches'] += 1
+        self.counters['batched_requests'] += len(requests)
+        end = time.perf_counter()
+        for (_, future, queued), (error, data, shape, dtype) in zip(requests, results):
+            self.counters['queue_seconds'] += start - queued
+            self.latency_sum += end - queued
+            self.latencies.append(end - queued)
+            if future.done():
+                continue
+            if error:
+                self.counters['errors'] += 1
+                future.set_exception(ValueError(error))
+            else:
+                future.set_result((data, shape, dtype))
+        try:
+            if broken:
+                await self.restart(executor)
+        finally:
+            self.busy -= 1
+            self.slots.release()
+
+    def metrics(self, prefix='flower_service'):
+        """
+        Queue depth, counters and latency quantiles in Prometheus text format
+        """
+        lines = ['# TYPE %s_queue_depth gauge' % prefix,
+                 '%s_queue_depth %d' % (prefix, self.queue.qsize()),
+                 '# TYPE %s_busy_workers gauge' % prefix,
+                 '%s_busy_workers %d' % (prefix, self.busy)]
+        for name, value in self.counters.items():
+            lines.append('# TYPE %s_%s_total counter' % (prefix, name))
+            lines.append('%s_%s_total %s' % (prefix, name, value))
+        lines.append('# TYPE %s_latency_seconds summary' % prefix)
+        if self.latencies:
+            for q in (0.5, 0.9, 0.99):
+                lines.append('%s_latency_seconds{quantile="%s"} %s'
+                             % (prefix, q, float(np.percentile(self.latencies, q*100))))
+        lines.append('%s_latency_seconds_sum %s' % (prefix, self.latency_sum))
+        lines.append('%s_latency_seconds_count %d' % (prefix, self.counters['batched_requests']))
+        return '\n'.join(lines) + '\n'
+
+    async def handle(self, reader, writer):
+        """
+        Handles one HTTP request
+        """
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            method, target = request.decode().split()[:2]
+            url = urlsplit(target)
+            if method != 'GET':
+                status, headers, body = '405 Method Not Allowed', {}, b'only GET is supported\n'
+            elif url.path == '/metrics':
+                status, headers, body = '200 OK', {'Content-Type': 'text/plain'}, self.metrics().encode()
+            elif url.path == '/health':
+                status, headers, body = '200 OK', {'Content-Type': 'text/plain'}, b'ok\n'
+            elif url.path == '/flower':
+                status, headers, body = await self.handle_flower(dict(parse_qsl(url.query)))
+            else:
+                status, headers, body = '404 Not Found', {}, b'unknown path\n'
+        except (ValueError, UnicodeDecodeError):
+            status, headers, body = '400 Bad Request', {}, b'bad request\n'
+        head = ['HTTP/1.1 %s' % status, 'Content-Length: %d' % len(body), 'Connection: close']
+        head += ['%s: %s' % item for item in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def check_args(self, seed, params):
+        """
+        Checks request arguments before the request is queued, returns error message or None
+        """
+        values = dict(params, seed=seed) if seed is not None else params
+        for name, value in values.items():
+            if name in ARG_CHOICES and value not in ARG_CHOICES[name]:
+                return '%s should be one of %s' % (name, ', '.join(ARG_CHOICES[name]))
+            if name in ARG_RANGES and not ARG_RANGES[name][0] <= value <= ARG_RANGES[name][1]:
+                return '%s should be from %d to %d' % ((name,) + ARG_RANGES[name])
+        render_size = params.get('img_size', 300)*params.get('supersample', 1)
+        if render_size > MAX_RENDER_SIZE:
+            return 'img_size*supersample should be not more than %d' % MAX_RENDER_SIZE
+        canvas_bytes = render_size**2*3*np.dtype(params.get('dtype', 'float64')).itemsize
+        if canvas_bytes > MAX_CANVAS_BYTES:
+            return 'canvas of %d bytes is more than %d bytes, use smaller img_size or uint8 dtype' \
+                % (canvas_bytes, MAX_CANVAS_BYTES)
+        grad_colors = params.get('grad_colors')
+        if grad_colors is not None and grad_colors != 'random' and grad_colors not in Colorer.color_dict:
+            return 'grad_colors should be one of %s or random' % ', '.join(Colorer.color_dict)
+        return None
+
+    async def handle_flower(self, query):
+        out_format = query.pop('format', 'png')
+        seed = int(query.pop('seed')) if 'seed' in query else None
+        unknown = set(query) - set(FLOWER_ARGS)
+        if out_format not in ('png', 'raw') or unknown:
+            return '400 Bad Request', {}, ('unknown arguments %s\n' % ', '.join(sorted(unknown))).encode()
+        params = {name: FLOWER_ARGS[name](value) for name, value in query.items()}
+        error = self.check_args(seed, params)
+        if error:
+            return '400 Bad Request', {}, (error + '\n').encode()
+        if params.get('grad_colors') == 'random':
+            params['grad_colors'] = None
+        try:
+            data, shape, dtype = await self.render(seed, params, out_format)
+        except asyncio.QueueFull:
+            return '503 Service Unavailable', {'Retry-After': '1'}, b'queue is full\n'
+        except ValueError as e:
+            return '422 Unprocessable Entity', {}, (str(e) + '\n').encode()
+        if out_format == 'png':
+            return '200 OK', {'Content-Type': 'image/png'}, data
+        return '200 OK', {'Content-Type': 'application/octet-stream',
+                          'X-Shape': ','.join(str(s) for s in shape),
+                          'X-Dtype': dtype}, data
+
+
+async def serve(service, host='127.0.0.1', port=8080, path=None):
+    """
+    Serves requests over HTTP on host and port, or on unix socket if path is set
+    """
+    await service.start()
+    if path:
+        server = await asyncio.start_unix_server(service.handle, path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve flower images over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', default=None, help='path of unix socket instead of host and port')
+    parser.add_argument('--workers', type=int, default=None, help='count of worker processes')
+    parser.add_argument('--max-queue', type=int, default=64, help='max count of waiting requests')
+    parser.add_argument('--max-batch', type=int, default=8, help='max count of requests sent to worker at once')
+    parser.add_argument('--batch-wait', type=float, default=0.002, help='seconds to wait for batching')
+    parser.add_argument('--cache-dir', default=None, help='directory of petal geometry cache')
+    parser.add_argument('--petal-library', default=None, help='path to petal library')
+    args = parser.parse_args()
+
+    async def run():
+        service = FlowerService(args.workers, args.max_queue, args.max_batch, args.batch_wait,
+                                args.cache_dir, args.petal_library)
+        await serve(service, args.host, args.port, args.unix)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
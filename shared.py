@@ -0,0 +1,271 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import batch
+
+# rings attached in worker process by name
+worker_rings = {}
+
+
+class SharedRing():
+    """
+    Ring of image slots in shared memory. Workers draw flowers right in slots,
+    consumers (in any process, see attach) read images without copying and pickling.
+
+    Parameters
+    ---------
+    slots: int, required
+        Count of image slots
+
+    shape: tuple, required
+        Image shape, (img_size, img_size, 3)
+
+    dtype: numpy.dtype
+        Image type, default=numpy.uint8
+
+    name: str
+        Name of existing shared memory to attach to, default=None (new shared memory is created)
+
+    Attributes
+    ---------
+    images: numpy.array
+        All slots with shape (slots,) + shape
+
+    free: collections.deque
+        Indices of free slots, only in process, which created ring
+    """
+    def __init__(self, slots, shape, dtype=np.uint8, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        size = slots*int(np.prod(self.shape))*self.dtype.itemsize
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = attach_memory(name)
+        self.images = np.ndarray((slots,) + self.shape, self.dtype, buffer=self.shm.buf)
+        self.free = deque(range(slots)) if self.owner else None
+
+    @classmethod
+    def attach(cls, name, slots, shape, dtype=np.uint8):
+        """
+        Attaches to ring created in other process, see describe
+        """
+        return cls(slots, shape, dtype, name)
+
+    def describe(self):
+        """
+        Arguments of attach to use ring in other process
+        """
+        return self.shm.name, self.slots, self.shape, self.dtype.str
+
+    def acquire(self):
+        """
+        Takes free slot, None if all slots are used
+        """
+        return self.free.popleft() if self.free else None
+
+    def release(self, slot):
+        """
+        Returns slot to free slots
+        """
+        self.free.append(slot)
+
+    def close(self):
+        """
+        Closes shared memory, it is removed if ring was created in this process.
+        Images of ring shouldn't be used after closing
+        """
+        self.images = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # views of images are still used, memory is unmapped when they are deleted
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach_memory(name):
+    """
+    Attaches to shared memory without tracking, memory is removed by the owner only,
+    not by resource tracker of this process when it exits
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python before 3.13 always tracks shared memory
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def render_to_slot(ring_info, slot, seed, params=None, with_params=False, max_retries=batch.MAX_RETRIES):
+    """
+    Draws flower in slot of shared ring in worker process
+
+    Parameters
+    ---------
+    ring_info: tuple, required
+        Description of ring, see SharedRing.describe
+
+    slot: int, required
+        Slot to draw in
+
+    seed: int, required
+        Seed of random generator for this flower
+
+    params: dict
+        Flower parameters, see batch.render_flower, default=None
+
+    with_params: bool
+        Return parameters of drawn flower too, default=False
+
+    max_retries: int
+        Count of new seeds for flower, which petals are out of image, see batch.draw_flower,
+        default=batch.MAX_RETRIES
+
+    Returns
+    ----------
+    tuple:
+        seed of drawn flower, slot, and parameters of flower with seed if with_params is True
+    """
+    if batch.worker_cache is None:
+        batch.init_worker()
+    ring = worker_rings.get(ring_info[0])
+    if ring is None:
+        ring = worker_rings[ring_info[0]] = SharedRing.attach(*ring_info)
+    params = params or {}
+    # supersampled flower is drawn on larger canvas and downsampled to slot
+    direct = params.get('supersample', 1) == 1
+    flower, seed = batch.draw_flower(seed, params, batch.worker_cache,
+                                     ring.images[slot] if direct else None, max_retries)
+    if not direct:
+        ring.images[slot] = flower.img
+    if with_params:
+        return seed, slot, dict(flower.get_params(), seed=seed)
+    return seed, slot
+
+
+def generate_shared(n, params=None, workers=None, seed=None, max_pending=None, cache_dir=None,
+                    with_params=False, seeds=None, ring=None, max_retries=batch.MAX_RETRIES, stats=None):
+    """
+    Renders flowers in worker processes right in shared memory, see batch.generate_batch.
+    Yielded image is a view of ring slot, it is valid until the next image is requested,
+    copy it to keep it longer
+
+    Parameters
+    ---------
+    n: int, required
+        Count of flowers
+
+    params: dict or list
+        Flower parameters, the same for all flowers, or list of parameters of every flower,
+        image size and dtype should be the same, default=None
+
+    workers: int
+        Count of worker processes, default=None (count of processors)
+
+    seed: int
+        Seed to generate seeds of all flowers, default=None (random)
+
+    max_pending: int
+        Max count of rendering flowers, not returned yet, default=None (4 per worker)
+
+    cache_dir: str
+        Directory to share petal geometry cache between workers, default=None (memory only)
+
+    with_params: bool
+        Return parameters of every flower too, default=False
+
+    seeds: list
+        Seeds of flowers, default=None (generated from seed)
+
+    ring: SharedRing
+        Ring to draw in with at least 2 slots, max_pending is cut to slots - 1,
+        default=None (new ring is created and closed)
+
+    max_retries: int
+        Count of new seeds for flower, which petals are out of image, see batch.draw_flower.
+        Flower is skipped, if petals are out of image with all seeds, default=batch.MAX_RETRIES
+
+    stats: dict
+        Dict to count 'retried' (drawn with new seed) and 'skipped' flowers in, default=None
+
+    Yields
+    ----------
+    tuple:
+        seed, slot of ring, image in slot (and parameters), in order of finishing
+    """
+    if seeds is None:
+        seeds = np.random.SeedSequence(seed).generate_state(n)
+    if ring is not None and ring.slots < 2:
+        raise ValueError('ring should have at least 2 slots, not %d' % ring.slots)
+    if stats is None:
+        stats = {}
+    stats.setdefault('retried', 0)
+    stats.setdefault('skipped', 0)
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 4*workers
+    first = (params[0] if isinstance(params, (list, tuple)) else params) or {}
+    own_ring = ring is None
+    if own_ring:
+        img_size = first.get('img_size', 300)
+        ring = SharedRing(max_pending + 1, (img_size, img_size, 3), first.get('dtype', np.float64))
+    max_pending = min(max_pending, ring.slots - 1)
+    try:
+        with ProcessPoolExecutor(workers, initializer=batch.init_worker, initargs=(cache_dir,)) as executor:
+            pending = {}
+            used = None
+            for i, task_seed in enumerate(seeds[:n]):
+                # pending flowers and the yielded one use all slots at most
+                while len(pending) >= max_pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        used = yield from yield_slot(ring, future, pending.pop(future), used, stats)
+                task_params = params[i] if isinstance(params, (list, tuple)) else params
+                slot = ring.acquire()
+                future = executor.submit(render_to_slot, ring.describe(), slot, int(task_seed),
+                                         task_params, with_params, max_retries)
+                pending[future] = (int(task_seed), slot)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    used = yield from yield_slot(ring, future, pending.pop(future), used, stats)
+            if used is not None:
+                ring.release(used)
+    finally:
+        if own_ring:
+            ring.close()
+
+
+def yield_slot(ring, future, task, used, stats):
+    """
+    Yields image of finished flower, slot of previous image is released.
+    Slot of skipped flower (petals are out of image with all seeds) is released at once
+    """
+    task_seed, slot = task
+    try:
+        result = future.result()
+    except IndexError:
+        stats['skipped'] += 1
+        ring.release(slot)
+        return used
+    if result[0] != task_seed:
+        stats['retried'] += 1
+    if used is not None:
+        ring.release(used)
+    yield (result[0], slot, ring.images[slot]) + tuple(result[2:])
+    return slot
@@ -0,0 +1,205 @@
+import json
+import numpy as np
+from petal import Petal
+
+
+def sample_values(dist, size, rng):
+    """
+    Samples values from distribution of flower spec
+
+    Parameters
+    ---------
+    dist: number or str or dict, required
+        Constant value or one of distributions:
+        {'randint': [low, high]} - integers from low to high (exclusive),
+        {'uniform': [low, high]} - floats from low to high,
+        {'normal': [mean, std]} - floats from normal distribution,
+        {'choice': [values], 'weights': [weights]} - values with weights (optional).
+        'div' - divisor of values, 'clip' - [low, high] to clip values,
+        'round' - count of decimals to round floats to
+
+    size: int or tuple, required
+        Shape of values
+
+    rng: numpy.random.Generator, required
+        Random generator
+
+    Returns
+    ----------
+    numpy.array:
+        sampled values
+    """
+    if not isinstance(dist, dict):
+        return np.full(size, dist)
+    if 'randint' in dist:
+        values = rng.integers(dist['randint'][0], dist['randint'][1], size)
+    elif 'uniform' in dist:
+        values = rng.uniform(dist['uniform'][0], dist['uniform'][1], size)
+    elif 'normal' in dist:
+        values = rng.normal(dist['normal'][0], dist['normal'][1], size)
+    elif 'choice' in dist:
+        weights = dist.get('weights')
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)/np.sum(weights)
+        values = np.asarray(dist['choice'])[rng.choice(len(dist['choice']), size, p=weights)]
+    else:
+        raise ValueError('unknown distribution %r' % dist)
+    if 'div' in dist:
+        values = values/dist['div']
+    if 'clip' in dist:
+        values = np.clip(values, dist['clip'][0], dist['clip'][1])
+    if 'round' in dist:
+        values = np.round(values, dist['round'])
+    return values
+
+
+def max_value(dist):
+    """
+    Max value of integer distribution, see sample_values
+    """
+    if not isinstance(dist, dict):
+        return int(dist)
+    if 'randint' in dist:
+        return int(dist['randint'][1]) - 1
+    if 'choice' in dist:
+        return int(max(dist['choice']))
+    if 'clip' in dist:
+        return int(dist['clip'][1])
+    raise ValueError('max value of %r is unknown' % dist)
+
+
+class FlowerSpec():
+    """
+    Declarative description of flowers: distributions of flower parameters.
+    Parameters of many flowers are sampled at once to structured numpy array,
+    every row can be drawn independently, so the array can be split to shards by row ranges.
+    Spec can be loaded from JSON or YAML (PyYAML is required) file, for example
+
+        {"img_size": 256,
+         "levels_cnt": {"choice": [2, 3], "weights": [3, 1]},
+         "grad_colors": {"choice": ["hot", "pink", "random"], "weights": [2, 1, 1]},
+         "petal_cnt": {"randint": [4, 8]},
+         "options": {"dtype": "uint8"}}
+
+    Parameters
+    ---------
+    spec: dict
+        Distributions of parameters (see sample_values and FLOWER_FIELDS, LEVEL_FIELDS),
+        missing ones are taken from DEFAULTS. 'img_size' is the same for all flowers,
+        'options' are other arguments of Flower, the same for all flowers, default=None
+
+    Attributes
+    ---------
+    FLOWER_FIELDS: dict
+        Types of parameters with one value per flower,
+        'grad_colors' is colormap name or 'random' for random colors
+
+    LEVEL_FIELDS: dict
+        Types of parameters with one value per level, see Flower
+
+    DEFAULTS: dict
+        Distributions of Flower random parameters
+    """
+    FLOWER_FIELDS = {'levels_cnt': np.int16,
+                     'center_size': np.int32,
+                     'fill_type': 'U16',
+                     'grad_colors': 'U16'}
+    LEVEL_FIELDS = {'petal_cnt': np.int16,
+                    'petal_kinds': np.int16,
+                    'scale': np.int32,
+                    'scale_x': np.float64,
+                    'center_dist': np.int32,
+                    'level_shrink': np.float64}
+    DEFAULTS = {'img_size': 300,
+                'levels_cnt': 2,
+                'center_size': 40,
+                'fill_type': 'center',
+                'grad_colors': 'hot',
+                'petal_cnt': {'randint': [4, 7]},
+                'petal_kinds': {'choice': Petal().kinds()},
+                'scale': {'randint': [90, 100]},
+                'scale_x': {'randint': [0, 40], 'div': 100},
+                'center_dist': {'randint': [-10, 10]},
+                'level_shrink': {'randint': [5, 8], 'div': 10},
+                'options': {}}
+
+    def __init__(self, spec=None):
+        spec = dict(spec or {})
+        unknown = set(spec) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError('unknown spec fields %s' % ', '.join(sorted(unknown)))
+        self.spec = dict(self.DEFAULTS, **spec)
+        self.img_size = int(self.spec['img_size'])
+        self.options = dict(self.spec['options'])
+        self.max_levels = max_value(self.spec['levels_cnt'])
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads spec from .json or .yaml (.yml) file
+        """
+        with open(path) as f:
+            if path.endswith(('.yaml', '.yml')):
+                import yaml
+                return cls(yaml.safe_load(f))
+            return cls(json.load(f))
+
+    def dtype(self):
+        """
+        Type of sampled rows: seed, flower fields and level fields with shape (max levels count,)
+        """
+        return np.dtype([('seed', np.uint32)]
+                        + [(name, dtype) for name, dtype in self.FLOWER_FIELDS.items()]
+                        + [(name, dtype, (self.max_levels,)) for name, dtype in self.LEVEL_FIELDS.items()])
+
+    def sample(self, n, seed=None):
+        """
+        Samples parameters of flowers
+
+        Parameters
+        ---------
+        n: int, required
+            Count of flowers
+
+        seed: int
+            Seed of sampling, default=None (random). Seeds of flowers are the same as
+            seeds of batch.generate_batch with the same seed
+
+        Returns
+        ----------
+        numpy.array:
+            structured array with n rows, see dtype. Level values after levels count are 0
+        """
+        seed_seq = np.random.SeedSequence(seed)
+        rows = np.zeros(n, dtype=self.dtype())
+        rows['seed'] = seed_seq.generate_state(n)
+        rng = np.random.default_rng(seed_seq.spawn(1)[0])
+        for name in self.FLOWER_FIELDS:
+            rows[name] = sample_values(self.spec[name], n, rng)
+        if np.any((rows['levels_cnt'] < 1) | (rows['levels_cnt'] > self.max_levels)):
+            raise ValueError('levels count should be from 1 to %d' % self.max_levels)
+        used = np.arange(self.max_levels) < rows['levels_cnt'][:, None]
+        for name in self.LEVEL_FIELDS:
+            rows[name] = np.where(used, sample_values(self.spec[name], (n, self.max_levels), rng), 0)
+        return rows
+
+    def to_params(self, row):
+        """
+        Parameters of flower from sampled row
+
+        Returns
+        ----------
+        dict:
+            arguments of Flower and 'grad_colors' of Flower.draw, see batch.render_flower
+        """
+        levels_cnt = int(row['levels_cnt'])
+        params = dict(self.options,
+                      img_size=self.img_size,
+                      levels_cnt=levels_cnt,
+                      center_size=int(row['center_size']),
+                      fill_type=str(row['fill_type']))
+        for name in self.LEVEL_FIELDS:
+            params[name] = row[name][:levels_cnt].tolist()
+        grad_colors = str(row['grad_colors'])
+        params['grad_colors'] = None if grad_colors == 'random' else grad_colors
+        return params
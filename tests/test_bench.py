@@ -0,0 +1,24 @@
+import json
+import bench
+
+
+def fail():
+    raise IndexError('petal is out of image')
+
+
+def test_measure_failed_calls():
+    res = bench.measure(fail, repeat=3)
+    assert res['errors'] == 4
+    assert res['p50_ms'] is None and res['per_sec'] is None
+    json.dumps(res, allow_nan=False)
+
+
+def test_compare():
+    ok = bench.measure(lambda: None, repeat=3)
+    failed = bench.measure(fail, repeat=3)
+    slow = dict(ok, p50_ms=ok['p50_ms']*2 + 1)
+    baseline = {'results': {'ok': ok, 'slow': ok, 'failed': ok, 'fixed': failed}}
+    results = {'results': {'ok': ok, 'slow': slow, 'failed': failed, 'fixed': ok, 'new': failed}}
+    assert bench.compare(results, baseline) == [('slow', ok['p50_ms'], slow['p50_ms']),
+                                                ('failed', ok['p50_ms'], None),
+                                                ('new', None, None)]
@@ -0,0 +1,60 @@
+import numpy as np
+from cache import GeometryCache
+from flower import Flower
+
+
+def make_value(n):
+    contour = np.arange(2*n, dtype=np.int32).reshape(-1, 1, 2)
+    points = [np.full((i + 1, 2), i, dtype=np.int32) for i in range(n)]
+    return contour, points
+
+
+def value_bytes(n):
+    contour, points = make_value(n)
+    return contour.nbytes + sum(p.nbytes for p in points) + 8*len(points)
+
+
+def test_lru_eviction_by_bytes():
+    cache = GeometryCache(max_bytes=2*value_bytes(10))
+    for name in 'ab':
+        cache.put((name,), *make_value(10))
+    assert cache.get(('a',)) is not None
+    cache.put(('c',), *make_value(10))
+    assert cache.get(('b',)) is None
+    assert cache.get(('a',)) is not None and cache.get(('c',)) is not None
+    assert cache.stats()['count'] == 2
+    assert cache.nbytes == 2*value_bytes(10)
+
+
+def test_put_existing_key_keeps_size():
+    cache = GeometryCache()
+    cache.put(('a',), *make_value(10))
+    cache.put(('a',), *make_value(10))
+    assert cache.nbytes == value_bytes(10)
+
+
+def test_disk_round_trip(tmp_path):
+    key = GeometryCache().make_key(3, None, np.int64(40), 95, 0.2, True, 'center', 'points', np.int64(20))
+    contour, points = make_value(5)
+    GeometryCache(cache_dir=str(tmp_path)).put(key, contour, points)
+    GeometryCache(cache_dir=str(tmp_path)).put(('empty',), contour, [])
+    cache = GeometryCache(cache_dir=str(tmp_path))
+    cached_contour, cached_points = cache.get(key)
+    np.testing.assert_array_equal(cached_contour, contour)
+    assert [p.tolist() for p in cached_points] == [p.tolist() for p in points]
+    assert cache.get(('empty',))[1] == []
+    assert cache.get(key) is not None
+    assert (cache.disk_hits, cache.hits, cache.misses) == (2, 1, 0)
+    assert cache.get(('unknown',)) is None and cache.misses == 1
+
+
+def test_cached_flower_is_the_same():
+    cache = GeometryCache()
+    images = []
+    for i in range(3):
+        flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8, cache=cache)
+        flower.draw()
+        images.append(flower.img)
+    assert cache.hits > 0
+    np.testing.assert_array_equal(images[0], images[1])
+    np.testing.assert_array_equal(images[0], images[2])
@@ -0,0 +1,198 @@
+import numpy as np
+import cv2
+import pytest
+import colormap
+from colorer import Colorer
+from flower import Flower
+from petal import Petal
+
+
+def random_fill_case(rng, dtype, uniform, size=8):
+    """
+    Small image and writes of fill_points with fill color, colors with the red channel of fill color
+    and other colors, so all pixel states and state changes happen
+    """
+    colorer = Colorer('center', dtype=dtype)
+    fill = colorer.to_dtype([0.5, 0.5, 0.5] if uniform else [0.5, 0.25, 0.5])
+    red_only = fill.copy()
+    red_only[1:] = colorer.to_dtype([0.9, 0.1])
+    palette = np.array([fill, red_only, colorer.to_dtype([0.2, 0.7, 0.3])])
+    img = palette[rng.integers(0, 3, (size, size))]
+    colors = palette[rng.integers(0, 3, 6)]
+    n = rng.integers(1, 20)
+    points = [rng.integers(1, size - 1, (n, 2))]
+    color_idx = [rng.integers(0, len(colors), n)]
+    return img, points, color_idx, colors, tuple(fill.tolist())
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.float64])
+@pytest.mark.parametrize('neighbours', [Colorer.GRAD_NEIGHBOURS, Colorer.GRAD_DIFF_NEIGHBOURS])
+def test_fill_points_batched_as_loop(dtype, neighbours):
+    rng = np.random.default_rng(0)
+    for trial in range(500):
+        img, points, color_idx, colors, fill = random_fill_case(rng, dtype, uniform=trial % 3 != 0)
+        results = []
+        for batched in (True, False):
+            filled, index = img.copy(), np.full(img.shape[:2], -1)
+            Colorer('center', batched=batched, dtype=dtype).fill_points(
+                filled, points, color_idx, colors, neighbours, fill, index, 3)
+            results.append((filled, index))
+        np.testing.assert_array_equal(results[0][0], results[1][0])
+        np.testing.assert_array_equal(results[0][1], results[1][1])
+
+
+@pytest.mark.parametrize('fill_type', ['top_down', 'diagonal', 'center'])
+def test_flower_batched_as_loop(fill_type):
+    images = []
+    for batched in (True, False):
+        flower = Flower(img_size=100, center_size=10, fill_type=fill_type, rng=0, dtype=np.uint8)
+        flower.colorer.batched = batched
+        flower.draw(record=True)
+        images.append((flower.img, flower.geometry['index']))
+    np.testing.assert_array_equal(images[0][0], images[1][0])
+    np.testing.assert_array_equal(images[0][1], images[1][1])
+
+
+def reference_points(contour, img_size, fill_type, diag_coord):
+    """
+    Points of point by point search, every pixel is tested with cv2.pointPolygonTest
+    """
+    def inside(row, col):
+        return cv2.pointPolygonTest(contour, (row, col), True) > 0
+
+    res_arr = []
+    if fill_type == 'top_down':
+        for row in range(img_size):
+            line = [[row, col] for col in range(img_size) if inside(row, col)]
+            if line:
+                res_arr.append(line)
+    elif fill_type == 'diagonal':
+        for row in range(img_size):
+            line = [[row - i, i] for i in range(row + 1) if inside(row - i, i)]
+            if line:
+                res_arr.append(line)
+        for row in range(img_size):
+            line = [[row + i, img_size - 1 - i] for i in range(img_size - row)
+                    if inside(row + i, img_size - 1 - i)]
+            if line:
+                res_arr.append(line)
+    else:
+        center_point = [diag_coord, diag_coord]
+        line = np.arange(0, img_size)
+        border = ([[0, i] for i in line] + [[img_size, i] for i in line] +
+                  [[i, 0] for i in line] + [[i, img_size] for i in line])
+        for point in border:
+            row_diff = point[0] - center_point[0]
+            col_diff = point[1] - center_point[1]
+            dist = int(np.round(np.sqrt(row_diff*row_diff + col_diff*col_diff)))
+            row_step, col_step = row_diff/dist, col_diff/dist
+            row_diff, col_diff = center_point
+            c_point = [int(np.round(row_diff)), int(np.round(col_diff))]
+            ray = []
+            while 0 <= c_point[0] < img_size and 0 <= c_point[1] < img_size:
+                if inside(c_point[0], c_point[1]):
+                    ray.append(c_point)
+                row_diff, col_diff = row_diff + row_step, col_diff + col_step
+                c_point = [int(np.round(row_diff)), int(np.round(col_diff))]
+            if ray:
+                res_arr.append(ray)
+    return res_arr
+
+
+@pytest.mark.parametrize('fill_type', ['top_down', 'diagonal', 'center'])
+def test_get_points_as_point_polygon_test(fill_type):
+    rng = np.random.default_rng(0)
+    petal = Petal()
+    colorer = Colorer(fill_type)
+    for trial in range(12):
+        lvl_size, scale = int(rng.integers(20, 60)), int(rng.integers(90, 100))
+        kind = petal.kinds()[trial % len(petal.kinds())]
+        contour = petal.draw(lvl_size, kind, True, bool(trial % 2), scale, rng.integers(0, 40)/100)
+        img_size = int(np.round(lvl_size/scale*120))
+        diag_coord = colorer.get_center(img_size)
+        if fill_type == 'center':
+            points = colorer.get_cntr_points_from_center(contour, img_size, diag_coord)
+        else:
+            points = colorer.get_points(contour, img_size)
+        expected = reference_points(contour, img_size, fill_type, diag_coord)
+        assert [np.asarray(line).tolist() for line in points] == expected
+
+
+def reference_fill(img, points, color_from, color_to, fill_color, fill_type):
+    """
+    Point by point filling, every point and its neighbours are checked and filled in order
+    """
+    def fill(row, col, color, check='all'):
+        # 'red' checks only the red channel, 'red+1' checks red channel + 1 of the pixel on the left
+        if check == 'all':
+            filled = all(img[row, col] == fill_color)
+        elif check == 'red':
+            filled = all(img[row, col][0] == fill_color)
+        else:
+            filled = all(img[row, col - 1][0] + 1 == fill_color)
+        if filled:
+            img[row, col] = color
+
+    if fill_type != 'center':
+        colors = colormap.split_colors(len(points), color_from, color_to)
+        for i, row in enumerate(points):
+            for point in row:
+                fill(point[1], point[0], colors[i])
+                fill(point[1] + 1, point[0] + 1, colors[i])
+                fill(point[1] + 1, point[0], colors[i], 'red')
+        return
+    for line in points:
+        colors = colormap.split_colors(len(line), color_from, color_to)
+        for i, point in enumerate(line):
+            fill(point[1], point[0], colors[i])
+            fill(point[1] + 1, point[0] + 1, colors[i])
+            fill(point[1] + 1, point[0], colors[i], 'red')
+            fill(point[1], point[0] + 1, colors[i])
+            fill(point[1] - 1, point[0] - 1, colors[i])
+            fill(point[1] - 1, point[0], colors[i], 'red')
+            fill(point[1], point[0] - 1, colors[i])
+            fill(point[1] - 1, point[0] + 1, colors[i], 'red+1')
+            fill(point[1] + 1, point[0] - 1, colors[i])
+
+
+@pytest.mark.parametrize('batched', [True, False])
+@pytest.mark.parametrize('fill_type', ['top_down', 'diagonal', 'center'])
+def test_fill_as_point_by_point(fill_type, batched):
+    rng = np.random.default_rng(0)
+    petal = Petal()
+    colorer = Colorer(fill_type, batched=batched)
+    for trial in range(12):
+        lvl_size, scale = int(rng.integers(20, 60)), int(rng.integers(90, 100))
+        kind = petal.kinds()[trial % len(petal.kinds())]
+        contour = petal.draw(lvl_size, kind, True, bool(trial % 2), scale, rng.integers(0, 40)/100)
+        img_size = int(np.round(lvl_size/scale*120))
+        points = colorer.get_points(contour, img_size)
+        fill_color = (0.5, 0.5, 0.5) if trial % 3 else (0.5, 0.25, 0.5)
+        color_from, color_to, border_color = rng.random((3, 3))
+        img = np.ones((img_size + 2, img_size + 2, 3))
+        cv2.fillPoly(img, pts=[contour], color=fill_color)
+        cv2.drawContours(img, [contour], -1, color=tuple(border_color), thickness=1)
+        expected = img.copy()
+        colorer.fill(img, contour, points, color_from, color_to, fill_color)
+        reference_fill(expected, points, color_from, color_to, fill_color, fill_type)
+        np.testing.assert_array_equal(img, expected)
+
+
+@pytest.mark.parametrize('neighbours', [Colorer.GRAD_NEIGHBOURS, Colorer.GRAD_DIFF_NEIGHBOURS])
+def test_fill_points_drop_outside(neighbours):
+    rng = np.random.default_rng(1)
+    for trial in range(300):
+        img, points, color_idx, colors, fill = random_fill_case(rng, np.uint8, uniform=trial % 3 != 0)
+        # points at the image border and out of image
+        points = [rng.integers(-1, img.shape[0] + 1, points[0].shape)]
+        results = []
+        for batched in (True, False):
+            filled, index = img.copy(), np.full(img.shape[:2], -1)
+            Colorer('center', batched=batched, dtype=np.uint8, drop_outside=True).fill_points(
+                filled, points, color_idx, colors, neighbours, fill, index, 3)
+            results.append((filled, index))
+        np.testing.assert_array_equal(results[0][0], results[1][0])
+        np.testing.assert_array_equal(results[0][1], results[1][1])
+    with pytest.raises(IndexError):
+        Colorer('center', dtype=np.uint8).fill_points(img.copy(), [np.array([[img.shape[1] - 1, 0]])], [[0]],
+                                                      colors, neighbours, fill)
@@ -0,0 +1,46 @@
+import numpy as np
+import colormap
+
+
+def arange_split_colors(color_count, color_from, color_to):
+    """
+    split_colors of point by point filling, gradient of every channel is numpy.arange
+    """
+    colors = []
+    for c in range(3):
+        step = np.abs(color_from[c] - color_to[c])/color_count
+        if step:
+            if color_from[c] > color_to[c]:
+                color = np.arange(color_from[c], color_to[c], -step)
+            else:
+                color = np.arange(color_from[c], color_to[c], step)
+        else:
+            color = [color_from[c] for i in np.arange(color_count)]
+        colors.append(color)
+    return [(a, b, c) for a, b, c in zip(colors[0], colors[1], colors[2])]
+
+
+def test_split_colors_as_arange():
+    rng = np.random.default_rng(0)
+    for trial in range(20000):
+        count = int(rng.integers(1, 300))
+        # colormap colors are tenths, random colors are any floats, equal channels give zero step
+        if trial % 2:
+            color_from, color_to = rng.random(3), rng.random(3)
+        else:
+            color_from, color_to = rng.integers(0, 11, 3)/10, rng.integers(0, 11, 3)/10
+        expected = np.array(arange_split_colors(count, color_from, color_to)).reshape(-1, 3)
+        colors = colormap.split_colors(count, color_from, color_to)
+        assert colors.shape == (count, 3)
+        # arange can give one more color, the extra color is never used
+        assert len(expected) >= count
+        np.testing.assert_array_equal(colors, expected[:count])
+
+
+def test_split_colors_of_many_gradients():
+    rng = np.random.default_rng(1)
+    color_from, color_to = rng.random(3), rng.random(3)
+    counts = rng.integers(1, 50, 20)
+    colors = colormap.split_colors(counts, color_from, color_to)
+    expected = np.concatenate([colormap.split_colors(count, color_from, color_to) for count in counts])
+    np.testing.assert_array_equal(colors, expected)
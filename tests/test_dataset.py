@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from dataset import FlowerDataset
+from spec import FlowerSpec
+
+PARAMS = {'img_size': 64, 'center_size': 8}
+
+
+def collect(dataset, *args):
+    return [(images.copy(),) + tuple(item) for images, *item in dataset.iterate(*args)]
+
+
+@pytest.mark.parametrize('params', [PARAMS, dict(PARAMS, supersample=2)])
+def test_batches_with_and_without_prefetch(params):
+    batches = collect(FlowerDataset(4, params, seed=0, batches=3, prefetch=0))
+    prefetched = collect(FlowerDataset(4, params, seed=0, batches=3, prefetch=2))
+    assert len(batches) == len(prefetched) == 3
+    for (images, seeds), (other_images, other_seeds) in zip(batches, prefetched):
+        assert images.shape == (4, 64, 64, 3) and images.dtype == np.uint8
+        np.testing.assert_array_equal(images, other_images)
+        np.testing.assert_array_equal(seeds, other_seeds)
+    # batches differ
+    assert not np.array_equal(batches[0][0], batches[1][0])
+
+
+def test_workers_split_batches():
+    dataset = FlowerDataset(2, PARAMS, seed=1, batches=5, prefetch=1, dtype=np.float32)
+    batches = collect(dataset)
+    split = [collect(dataset, worker_id, 2) for worker_id in range(2)]
+    assert len(split[0]) == 3 and len(split[1]) == 2
+    for index, (images, seeds) in enumerate(batches):
+        other_images, other_seeds = split[index % 2][index // 2]
+        assert images.dtype == np.float32
+        np.testing.assert_array_equal(images, other_images)
+        np.testing.assert_array_equal(seeds, other_seeds)
+
+
+def test_spec_params():
+    spec = FlowerSpec({'img_size': 64, 'center_size': 8, 'levels_cnt': {'choice': [1, 2]},
+                       'center_dist': {'randint': [-3, 3]}})
+    dataset = FlowerDataset(3, spec=spec, seed=0, batches=2, with_params=True)
+    assert len(dataset) == 2
+    for images, seeds, params in dataset:
+        assert images.shape == (3, 64, 64, 3)
+        assert [p['seed'] for p in params] == seeds.tolist()
+        assert all(len(p['petal_cnt']) == p['levels_cnt'] for p in params)
+
+
+def test_endless_dataset_has_no_length():
+    dataset = FlowerDataset(2, PARAMS, seed=0)
+    with pytest.raises(TypeError):
+        len(dataset)
+    items = dataset.iterate()
+    for i in range(3):
+        next(items)
+    items.close()
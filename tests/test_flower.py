@@ -0,0 +1,102 @@
+import hashlib
+import numpy as np
+import pytest
+from flower import Flower
+
+
+@pytest.mark.parametrize('supersample', [2, 3])
+@pytest.mark.parametrize('seed', [0, 17, 38])
+def test_supersample_draws_the_same_flower(seed, supersample):
+    # petal points of these seeds are out of the finer canvas by a pixel
+    images = []
+    for k in (1, supersample):
+        flower = Flower(img_size=128, center_size=15, rng=seed, dtype=np.uint8, supersample=k)
+        flower.draw()
+        images.append(flower.img.astype(int))
+    assert images[1].shape == (128, 128, 3)
+    # borders are smoothed, other flowers differ by more than 50 in mean and in 25% of pixels
+    diff = np.abs(images[1] - images[0]).max(axis=2)
+    assert diff.mean() < 25
+    assert np.mean(diff > 64) < 0.15
+
+
+def test_draw_keeps_random_configuration():
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8)
+    assert flower.get_params()['center_dist'] == 'random'
+    flower.draw()
+    first = flower.get_params()
+    flower.draw()
+    assert flower.center_dist == 'random' and flower.level_shrink == 'random'
+    assert len(flower.get_params()['center_dist']) == flower.levels_cnt
+    assert flower.get_params()['level_shrink'] != first['level_shrink'] \
+        or flower.get_params()['center_dist'] != first['center_dist']
+
+
+def test_draw_twice_resets_labels():
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8)
+    flower.draw(labels=True)
+    count = len(flower.instances)
+    flower.draw(labels=True)
+    assert len(flower.instances) == count
+    assert flower.label_map.max() == count
+    assert sorted(set(instance['level'] for instance in flower.instances)) == list(range(flower.levels_cnt))
+    flower.draw()
+    assert flower.instances is None and flower.label_map is None and flower.semantic_mask is None
+
+
+def test_draw_twice_resets_geometry():
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8)
+    flower.draw(record=True)
+    flower.draw(record=True)
+    assert len(flower.geometry['levels']) == flower.levels_cnt
+    assert flower.geometry['index'].max() < flower.geometry['palette_size']
+    flower.draw()
+    assert flower.geometry is None
+    with pytest.raises(ValueError):
+        flower.recolor('cold')
+
+
+def test_draw_twice_keeps_layers_of_last_draw():
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8, layered=True)
+    flower.draw()
+    flower.draw()
+    assert len(flower.layers) == flower.levels_cnt
+
+
+def test_draw_twice_keeps_colors_of_last_draw():
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8)
+    grad_colors = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6], [0.7, 0.8, 0.9]]
+    flower.draw('hot')
+    flower.draw(grad_colors)
+    assert flower.get_params()['colors'] == [grad_colors]*flower.levels_cnt
+
+
+# sha1 of images of point by point drawing, flowers of global numpy random state
+REFERENCE_DIGESTS = {
+    ('top_down', 'hot', 0): '82aec391d7d5535911a58efdcaf674745efa2e15',
+    ('top_down', 'hot', 1): '3917c7281bbfb86347dbc65a73916fdd182acee5',
+    ('top_down', 'hot', 2): '415d684b4155f8a15665ac9b4ef4f1a5c7de1332',
+    ('top_down', None, 0): '1cb30367502f296b9a9a19354cc6ab9937b60ee4',
+    ('top_down', None, 1): 'd8c7f5033a380d411226f1432bab76e3e52f2612',
+    ('top_down', None, 2): '30ba679018c6b3d8bef039a481bdea771b5dca23',
+    ('diagonal', 'hot', 0): 'fc830e10d38259df22b67ce01ce755ec4a0380b1',
+    ('diagonal', 'hot', 1): '6729262cb3a1510dad207c042ac87504680d3776',
+    ('diagonal', 'hot', 2): '6b9d051c446aae181e3f801c8b0cdddd9b7739d7',
+    ('diagonal', None, 0): '3d0b183b191fd9022337c9e3759293caa4b1aac1',
+    ('diagonal', None, 1): 'd347d01337c7929902db0effda6bda4c2487ea47',
+    ('diagonal', None, 2): '4504524633d7fcf264bf7d33ff7fa96715f517a9',
+    ('center', 'hot', 0): '2224d06080ecea813cd43f8af7fb38b5b39e870b',
+    ('center', 'hot', 1): 'fb5410206cffe6ec57a7e2929a393a972937033d',
+    ('center', 'hot', 2): '6a78b1e7b8a822d4b451c8cbf4cd89676e7a8a64',
+    ('center', None, 0): '75095da4ea2ebfd1269d03ef9fd161469fe76381',
+    ('center', None, 1): '0910e26e9ca5a5298160bf1d59a4124c6b45762f',
+    ('center', None, 2): 'b7baa8c27ed242fad33de75378db85b9f926bded'}
+
+
+@pytest.mark.parametrize('fill_type, grad_colors, seed', list(REFERENCE_DIGESTS))
+def test_draw_as_point_by_point(fill_type, grad_colors, seed):
+    np.random.seed(seed)
+    flower = Flower(120, 15, fill_type=fill_type, levels_cnt=2 + seed % 2)
+    flower.draw(grad_colors=grad_colors)
+    digest = hashlib.sha1(np.ascontiguousarray(flower.img).tobytes()).hexdigest()
+    assert digest == REFERENCE_DIGESTS[fill_type, grad_colors, seed]
@@ -0,0 +1,39 @@
+import numpy as np
+import cv2
+import pytest
+from flower import Flower
+
+
+@pytest.mark.parametrize('supersample', [1, 2])
+def test_pyramid_sizes(supersample):
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8, supersample=supersample)
+    flower.draw(labels=True, sizes=[32, 128, 64, 64])
+    assert list(flower.pyramid) == [128, 64, 32]
+    assert flower.pyramid[128] is flower.img
+    for size, img in flower.pyramid.items():
+        assert img.shape == (size, size, 3) and img.dtype == np.uint8
+        labels = flower.label_pyramid[size]
+        assert labels['label_map'].shape == labels['semantic_mask'].shape == (size, size)
+        # labels aren't mixed by downsampling
+        assert set(np.unique(labels['label_map'])) <= set(range(len(flower.instances) + 1))
+        assert set(np.unique(labels['semantic_mask'])) <= {Flower.BACKGROUND, Flower.CENTER, Flower.PETAL}
+    expected = cv2.resize(flower.canvas, (32, 32), interpolation=cv2.INTER_AREA)
+    np.testing.assert_array_equal(flower.pyramid[32], expected)
+
+
+def test_pyramid_of_last_draw():
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8)
+    flower.draw(record=True, sizes=[64])
+    assert flower.label_pyramid is None and list(flower.pyramid) == [64]
+    flower.recolor('cold')
+    expected = cv2.resize(flower.canvas, (64, 64), interpolation=cv2.INTER_AREA)
+    np.testing.assert_array_equal(flower.pyramid[64], expected)
+    flower.draw()
+    assert flower.pyramid is None and flower.label_pyramid is None
+
+
+@pytest.mark.parametrize('sizes', [[], [0], [64, -1], [129]])
+def test_bad_pyramid_sizes(sizes):
+    flower = Flower(img_size=128, center_size=15, rng=5, dtype=np.uint8)
+    with pytest.raises(ValueError):
+        flower.draw(sizes=sizes)
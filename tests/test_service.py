@@ -0,0 +1,45 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from service import FlowerService
+
+PARAMS = {'img_size': 64, 'center_size': 8, 'dtype': 'uint8'}
+
+
+@pytest.mark.parametrize('params', [{'img_size': 4096, 'supersample': 8},
+                                    {'img_size': 4096, 'dtype': 'float64'},
+                                    {'fill_type': 'bogus'},
+                                    {'grad_colors': 'bogus'}])
+def test_check_args_rejects(params):
+    service = FlowerService(workers=1)
+    assert service.check_args(0, params) is not None
+    service.executor.shutdown()
+
+
+def test_check_args_accepts():
+    service = FlowerService(workers=1)
+    assert service.check_args(0, dict(PARAMS, grad_colors='random')) is None
+    assert service.check_args(0, {'img_size': 4096, 'dtype': 'uint8'}) is None
+    service.executor.shutdown()
+
+
+def test_broken_workers_are_restarted():
+    async def run():
+        service = FlowerService(workers=1, batch_wait=0)
+        await service.start()
+        try:
+            assert (await service.render(1, PARAMS, 'raw'))[1] == (64, 64, 3)
+            broken = service.executor
+            # worker dies as if it was killed
+            with pytest.raises(BrokenProcessPool):
+                await asyncio.wrap_future(broken.submit(os._exit, 1))
+            with pytest.raises(ValueError):
+                await service.render(1, PARAMS, 'raw')
+            assert (await service.render(1, PARAMS, 'raw'))[1] == (64, 64, 3)
+            assert service.executor is not broken
+            assert service.counters['restarts'] == 1
+            assert service.busy == 0
+        finally:
+            await service.close()
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import batch
+from cache import GeometryCache
+from shared import SharedRing, generate_shared
+
+PARAMS = {'img_size': 64, 'center_size': 8, 'dtype': 'uint8'}
+
+
+def expected_images(seeds, max_retries):
+    """
+    Images of flowers drawn in this process by seed of drawn flower, skipped flowers are missing
+    """
+    images, cache = {}, GeometryCache()
+    for seed in seeds:
+        try:
+            flower, drawn_seed = batch.draw_flower(int(seed), PARAMS, cache, max_retries=max_retries)
+        except IndexError:
+            continue
+        images[drawn_seed] = flower.img
+    return images
+
+
+def test_ring_attach():
+    with SharedRing(3, (4, 4, 3)) as ring:
+        other = SharedRing.attach(*ring.describe())
+        slots = [ring.acquire() for i in range(3)]
+        assert sorted(slots) == [0, 1, 2] and ring.acquire() is None
+        other.images[slots[1]] = 7
+        assert np.all(ring.images[slots[1]] == 7)
+        ring.release(slots[1])
+        assert ring.acquire() == slots[1]
+        other.close()
+
+
+@pytest.mark.parametrize('max_retries', [batch.MAX_RETRIES, 0])
+def test_generate_shared(max_retries):
+    seeds = list(range(12))
+    expected = expected_images(seeds, max_retries)
+    stats = {}
+    with SharedRing(2, (64, 64, 3)) as ring:
+        drawn = {}
+        for seed, slot, img in generate_shared(len(seeds), PARAMS, workers=2, seeds=seeds, ring=ring,
+                                               max_retries=max_retries, stats=stats):
+            # the yielded slot isn't given to other flowers until the next image is requested
+            assert slot not in ring.free
+            drawn[seed] = img.copy()
+        # slots of yielded and skipped flowers are released
+        assert sorted(ring.free) == [0, 1]
+    assert sorted(drawn) == sorted(expected)
+    for seed, img in drawn.items():
+        np.testing.assert_array_equal(img, expected[seed])
+    assert stats['skipped'] == len(seeds) - len(expected)
+    assert stats['retried'] == len(set(expected) - set(seeds))
+    if max_retries == 0:
+        assert stats['skipped'] > 0
+
+
+def test_ring_of_one_slot():
+    with SharedRing(1, (64, 64, 3)) as ring:
+        with pytest.raises(ValueError):
+            list(generate_shared(2, PARAMS, workers=1, seed=0, ring=ring))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from flower import Flower
+from spec import FlowerSpec, sample_values
+
+SPEC = {'img_size': 96,
+        'levels_cnt': {'choice': [1, 2, 3], 'weights': [1, 0, 1]},
+        'center_size': 12,
+        'fill_type': {'choice': ['top_down', 'center']},
+        'grad_colors': {'choice': ['pink', 'random']},
+        'scale_x': {'uniform': [0, 0.4], 'round': 2},
+        'center_dist': {'normal': [0, 20], 'clip': [-5, 5]},
+        'options': {'dtype': 'uint8'}}
+
+
+def test_sample_values():
+    rng = np.random.default_rng(0)
+    assert sample_values(7, 3, rng).tolist() == [7, 7, 7]
+    values = sample_values({'randint': [5, 8], 'div': 10}, 1000, rng)
+    assert set(values.tolist()) == {0.5, 0.6, 0.7}
+    values = sample_values({'choice': ['a', 'b', 'c'], 'weights': [1, 0, 3]}, 1000, rng)
+    assert set(values.tolist()) == {'a', 'c'}
+    with pytest.raises(ValueError):
+        sample_values({'poisson': [1]}, 3, rng)
+
+
+def test_sample_rows():
+    spec = FlowerSpec(SPEC)
+    rows = spec.sample(500, seed=3)
+    assert rows.shape == (500,) and rows['petal_cnt'].shape == (500, 3)
+    np.testing.assert_array_equal(rows, spec.sample(500, seed=3))
+    # seeds of flowers are the seeds of batch.generate_batch
+    np.testing.assert_array_equal(rows['seed'], np.random.SeedSequence(3).generate_state(500))
+    assert set(rows['levels_cnt'].tolist()) == {1, 3}
+    assert set(rows['fill_type'].tolist()) == {'top_down', 'center'}
+    assert np.all(rows['center_size'] == 12)
+    used = np.arange(3) < rows['levels_cnt'][:, None]
+    for name in FlowerSpec.LEVEL_FIELDS:
+        assert np.all(rows[name][~used] == 0)
+    assert np.all((rows['petal_cnt'][used] >= 4) & (rows['petal_cnt'][used] < 7))
+    assert np.all(np.abs(rows['center_dist']) <= 5)
+    assert np.all(rows['scale_x'] == np.round(rows['scale_x'], 2))
+
+
+def test_to_params_draws_flower():
+    spec = FlowerSpec(SPEC)
+    rows = spec.sample(10, seed=0)
+    for row in rows:
+        params = spec.to_params(row)
+        levels_cnt = params['levels_cnt']
+        assert params['img_size'] == 96 and params['dtype'] == 'uint8'
+        assert all(len(params[name]) == levels_cnt for name in FlowerSpec.LEVEL_FIELDS)
+        assert all(type(value) in (int, float) for name in FlowerSpec.LEVEL_FIELDS for value in params[name])
+        assert params['grad_colors'] in ('pink', None)
+    params = spec.to_params(rows[0])
+    grad_colors = params.pop('grad_colors')
+    flower = Flower(rng=int(rows[0]['seed']), **params)
+    flower.draw(grad_colors)
+    assert flower.get_params()['petal_cnt'] == params['petal_cnt']
+    assert flower.get_params()['center_dist'] == params['center_dist']
+
+
+def test_bad_specs():
+    with pytest.raises(ValueError):
+        FlowerSpec({'petals': 5})
+    with pytest.raises(ValueError):
+        FlowerSpec({'levels_cnt': {'randint': [0, 3]}}).sample(100, seed=0)
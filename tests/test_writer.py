@@ -0,0 +1,57 @@
+import json
+import os
+import tarfile
+import numpy as np
+import cv2
+import pytest
+from writer import DatasetWriter, write_dataset, to_uint8
+
+
+def make_images(n, size=8):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for i in range(n)]
+
+
+def read_params(path):
+    with open(os.path.join(path, 'params.jsonl')) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_tar_shards(tmp_path):
+    images = make_images(5)
+    written = write_dataset(((i, img, {'seed': i}) for i, img in enumerate(images)), str(tmp_path),
+                            shard_size=2, encode_workers=2, max_pending=1)
+    assert written == 5
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.tar')) == \
+        ['shard-000000.tar', 'shard-000001.tar', 'shard-000002.tar']
+    for i, img in enumerate(images):
+        with tarfile.open(os.path.join(tmp_path, 'shard-%06d.tar' % (i // 2))) as shard:
+            keys = range(i//2*2, min(i//2*2 + 2, 5))
+            assert shard.getnames() == [name % j for j in keys for name in ('%d.png', '%d.json')]
+            data = np.frombuffer(shard.extractfile('%d.png' % i).read(), np.uint8)
+            decoded = cv2.cvtColor(cv2.imdecode(data, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+            np.testing.assert_array_equal(decoded, img)
+            assert json.loads(shard.extractfile('%d.json' % i).read()) == {'seed': i}
+    assert [(r['key'], r['shard'], r['seed']) for r in read_params(str(tmp_path))] == \
+        [(str(i), i // 2, i) for i in range(5)]
+
+
+@pytest.mark.parametrize('written', [3, 5])
+def test_npy_stack(tmp_path, written):
+    images = [img/255 for img in make_images(written)]
+    with DatasetWriter(str(tmp_path), out_format='npy', count=5) as writer:
+        for i, img in enumerate(images):
+            writer.write(i, img, {'seed': i})
+    # file is cut to written images, when some flowers are skipped
+    stack = np.load(os.path.join(tmp_path, 'images.npy'))
+    assert stack.shape == (written, 8, 8, 3) and stack.dtype == np.uint8
+    for i, img in enumerate(images):
+        np.testing.assert_array_equal(stack[i], to_uint8(img))
+    assert [r['index'] for r in read_params(str(tmp_path))] == list(range(written))
+
+
+def test_bad_formats(tmp_path):
+    with pytest.raises(ValueError):
+        DatasetWriter(str(tmp_path), out_format='zip')
+    with pytest.raises(ValueError):
+        DatasetWriter(str(tmp_path), out_format='npy')
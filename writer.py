@@ -0,0 +1,192 @@
+import io
+import os
+import json
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+
+class DatasetWriter():
+    """
+    Writes flower images to disk while new flowers are drawn.
+    Images are encoded in background threads, count of images in memory is bounded.
+    Parameters of every flower are written to params.jsonl.
+
+    Parameters
+    ---------
+    path: str, required
+        Directory of dataset
+
+    out_format: str
+        'tar' - shards of tar archives in WebDataset layout ({key}.png and {key}.json),
+        'npy' - one images.npy file with shape (count, img_size, img_size, 3), default='tar'
+
+    image_format: str
+        Image encoding for tar shards: 'png', 'jpg' or 'webp', default='png'
+
+    shard_size: int
+        Count of images in one tar shard, default=10000
+
+    count: int
+        Max count of images, required for 'npy' format, file is cut to written images on close, default=None
+
+    encode_workers: int
+        Count of encoding threads, default=4
+
+    max_pending: int
+        Max count of images waiting for encoding, default=None (4 per encoding thread)
+
+    quality: int
+        Quality of jpg and webp images, default=95
+    """
+    def __init__(self,
+                 path,
+                 out_format='tar',
+                 image_format='png',
+                 shard_size=10000,
+                 count=None,
+                 encode_workers=4,
+                 max_pending=None,
+                 quality=95):
+        if out_format not in ('tar', 'npy'):
+            raise ValueError("out_format should be 'tar' or 'npy', not %r" % out_format)
+        if out_format == 'npy' and count is None:
+            raise ValueError("count is required for 'npy' format")
+        self.path = path
+        self.out_format = out_format
+        self.image_format = image_format
+        self.shard_size = shard_size
+        self.count = count
+        self.quality = quality
+        self.max_pending = max_pending or 4*encode_workers
+        self.executor = ThreadPoolExecutor(encode_workers)
+        self.pending = deque()
+        self.written = 0
+        self.shard = None
+        self.stack = None
+        os.makedirs(path, exist_ok=True)
+        self.params_file = open(os.path.join(path, 'params.jsonl'), 'w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, key, img, params=None):
+        """
+        Adds image to dataset
+
+        Parameters
+        ---------
+        key: str or int, required
+            Unique name of image, seed for example
+
+        img: numpy.array, required
+            Image containing flower, RGB, float in [0,1] or uint8
+
+        params: dict
+            Parameters of flower, see Flower.get_params, default=None
+        """
+        if len(self.pending) >= self.max_pending:
+            self.write_encoded(*self.pending.popleft())
+        if self.out_format == 'tar':
+            self.pending.append((key, self.executor.submit(self.encode, img), params))
+        else:
+            self.write_encoded(key, None, params, img)
+
+    def encode(self, img):
+        """
+        Encodes RGB image to bytes of image format
+        """
+        img = cv2.cvtColor(to_uint8(img), cv2.COLOR_RGB2BGR)
+        if self.image_format == 'png':
+            flags = []
+        elif self.image_format == 'webp':
+            flags = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        else:
+            flags = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        _, buf = cv2.imencode('.' + self.image_format, img, flags)
+        return buf.tobytes()
+
+    def write_encoded(self, key, encoded, params, img=None):
+        record = {'key': str(key)}
+        if self.out_format == 'tar':
+            shard_num = self.written // self.shard_size
+            if self.written % self.shard_size == 0:
+                self.close_shard()
+                self.shard = tarfile.open(os.path.join(self.path, 'shard-%06d.tar' % shard_num), 'w')
+            self.add_file('%s.%s' % (key, self.image_format), encoded.result())
+            self.add_file('%s.json' % key, json.dumps(params or {}).encode())
+            record['shard'] = shard_num
+        else:
+            if self.stack is None:
+                self.stack = np.lib.format.open_memmap(os.path.join(self.path, 'images.npy'), mode='w+',
+                                                       dtype=np.uint8, shape=(self.count,) + img.shape)
+            self.stack[self.written] = to_uint8(img)
+            record['index'] = self.written
+        record.update(params or {})
+        self.params_file.write(json.dumps(record) + '\n')
+        self.written += 1
+
+    def add_file(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        self.shard.addfile(info, io.BytesIO(data))
+
+    def close_shard(self):
+        if self.shard is not None:
+            self.shard.close()
+            self.shard = None
+
+    def close(self):
+        """
+        Writes all pending images and closes files
+        """
+        while self.pending:
+            self.write_encoded(*self.pending.popleft())
+        self.executor.shutdown()
+        self.close_shard()
+        if self.stack is not None:
+            self.stack.flush()
+            self.stack = None
+            if self.written < self.count:
+                # some flowers are skipped, file is rewritten with written images only
+                path = os.path.join(self.path, 'images.npy')
+                np.save(path + '.tmp.npy', np.load(path, mmap_mode='r')[:self.written])
+                os.replace(path + '.tmp.npy', path)
+        self.params_file.close()
+
+
+def to_uint8(img):
+    """
+    Converts float image in [0,1] to uint8 image
+    """
+    if img.dtype == np.uint8:
+        return img
+    return np.uint8(np.clip(np.round(img*255), 0, 255))
+
+
+def write_dataset(flowers, path, **kwargs):
+    """
+    Writes flowers to disk, see DatasetWriter
+
+    Parameters
+    ---------
+    flowers: iterable, required
+        (key, image, params) for every flower, generate_batch(..., with_params=True) for example
+
+    path: str, required
+        Directory of dataset
+
+    Returns
+    ----------
+    int:
+        count of written images
+    """
+    with DatasetWriter(path, **kwargs) as writer:
+        for key, img, params in flowers:
+            writer.write(key, img, params)
+    return writer.written